@@ -441,7 +441,7 @@ def render_chat_interface():
     with st.expander("Anhänge", expanded=bool(st.session_state.chat_attachments)):
         uploaded_files = st.file_uploader(
             "Dateien hochladen (PDF, Word, Excel, E-Mails...)",
-            type=[ext.replace(".", "") for ext in ALL_EXTENSIONS],
+            type=[ext.replace(".", "") for ext in sorted(ALL_EXTENSIONS)],
             accept_multiple_files=True,
             key="chat_file_upload",
             label_visibility="collapsed"
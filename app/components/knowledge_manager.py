@@ -293,7 +293,7 @@ def render_upload_tab():
     # Datei-Upload
     uploaded_files = st.file_uploader(
         "Dateien auswählen",
-        type=[ext.replace(".", "") for ext in ALL_EXTENSIONS],
+        type=[ext.replace(".", "") for ext in sorted(ALL_EXTENSIONS)],
         accept_multiple_files=True,
         help="Drag & Drop oder klicken zum Auswählen"
     )
@@ -312,19 +312,19 @@ def render_upload_tab():
 
             results = {"local": 0, "openai": 0, "errors": 0}
 
-            for idx, file in enumerate(uploaded_files):
+            # Dateien parallel extrahieren, fertige Dokumente der Reihe nach einbetten
+            verarbeitet = document_processor.process_bytes_batch(
+                [(file.read(), file.name) for file in uploaded_files],
+                knowledge_base_id=target_kb,
+                uploader_id="user"
+            )
+
+            for idx, (file, (doc, fehler)) in enumerate(zip(uploaded_files, verarbeitet)):
                 status.text(f"Verarbeite {file.name}...")
 
                 try:
-                    # Datei verarbeiten
-                    content = file.read()
-
-                    doc = document_processor.process_bytes(
-                        content=content,
-                        filename=file.name,
-                        knowledge_base_id=target_kb,
-                        uploader_id="user"
-                    )
+                    if fehler:
+                        raise fehler
 
                     # Zur Wissensbank hinzufügen (Dual-Embedding)
                     embed_result = rag_engine.add_document(doc)
@@ -4,15 +4,44 @@ Intelligenter Chatbot zur Erfassung von Versicherungsschäden
 """
 
 import streamlit as st
+import io
 import json
+import os
+import atexit
+import functools
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import types
 import uuid
+from collections import namedtuple
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime, date
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any, List, Mapping, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
+from html import escape
 
-from app.config import DATA_DIR
+from PIL import Image, ImageOps
+
+# HEIC-Unterstützung für iPhone-Fotos (optional)
+try:
+    from pillow_heif import register_heif_opener
+    HEIF_AVAILABLE = True
+except ImportError:
+    HEIF_AVAILABLE = False
+
+# Kompaktes Binärformat für die interne Ablage (optional)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+from app.config import config, DATA_DIR
 from app.core.llm_provider import llm_provider
 from app.core.fuzzy_risk_engine import fuzzy_risk_engine, FuzzyResult, RiskLevel
 from app.core.input_validator import swiss_validator, generate_validation_response
@@ -20,17 +49,25 @@ from app.core.input_validator import swiss_validator, generate_validation_respon
 
 # Schadensmeldungen Verzeichnis
 CLAIMS_DIR = DATA_DIR / "schadensmeldungen"
-CLAIMS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Fotos Verzeichnis
 FOTOS_DIR = DATA_DIR / "schadensmeldungen" / "fotos"
-FOTOS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Schadenstypen bei denen Fotos sinnvoll sind
 FOTO_RELEVANT_TYPEN = ["Motorfahrzeug", "Hausrat", "Gebäude", "Haftpflicht", "Unfall"]
 
+# Maximale Kantenlänge der Upload-Vorschau in Pixel
+VORSCHAU_GROESSE = 256
+
+# Gespeicherte Fotos: maximale Kantenlänge in Pixel und WebP-Qualität
+FOTO_MAX_KANTE = 1920
+FOTO_WEBP_QUALITAET = 80
+
+# Fotos pro Seite in der Detailansicht
+FOTOS_PRO_SEITE = 9
 
-class SchadensTyp(Enum):
+
+class SchadensTyp(str, Enum):
     """Versicherbare Schadensarten"""
     MOTORFAHRZEUG = "Motorfahrzeug"
     HAUSRAT = "Hausrat"
@@ -42,7 +79,7 @@ class SchadensTyp(Enum):
     ANDERE = "Andere"
 
 
-class SchadensStatus(Enum):
+class SchadensStatus(str, Enum):
     """Status einer Schadensmeldung"""
     ENTWURF = "Entwurf"
     EINGEREICHT = "Eingereicht"
@@ -50,6 +87,33 @@ class SchadensStatus(Enum):
     ABGESCHLOSSEN = "Abgeschlossen"
 
 
+# Symbole für die Übersicht
+_TYP_EMOJI = {
+    "Motorfahrzeug": "🚗",
+    "Hausrat": "🏠",
+    "Gebäude": "🏢",
+    "Haftpflicht": "⚖️",
+    "Reise": "✈️",
+    "Rechtsschutz": "📜",
+    "Unfall": "🚑",
+    "Andere": "📋"
+}
+
+_STATUS_FARBE = {
+    SchadensStatus.ENTWURF: "🟡",
+    SchadensStatus.EINGEREICHT: "🔵",
+    SchadensStatus.IN_BEARBEITUNG: "🟠",
+    SchadensStatus.ABGESCHLOSSEN: "🟢"
+}
+
+
+# Marker für noch nicht gesetzte Attribute (Dirty-Tracking)
+_UNGESETZT = object()
+
+# Nicht verfolgte Attribute: der Chat-Verlauf wird separat im Chatlog gespeichert
+_NICHT_VERFOLGT = frozenset({"_dirty", "chat_history"})
+
+
 @dataclass
 class Schadensmeldung:
     """Datenmodell für eine Schadensmeldung"""
@@ -105,8 +169,26 @@ class Schadensmeldung:
     erfassung_abgeschlossen: bool = False
     aktuelle_frage: int = 0
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Geänderte Felder markieren die Meldung als ungespeichert (_dirty)
+        if name not in _NICHT_VERFOLGT and self.__dict__.get(name, _UNGESETZT) != value:
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, name, value)
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.__dict__.get("_dirty", True)
+
+    def mark_clean(self) -> None:
+        object.__setattr__(self, "_dirty", False)
+
     def to_dict(self) -> dict:
-        return asdict(self)
+        # Flache Kopie: alle Felder sind bereits JSON-kompatibel, ein
+        # rekursives asdict() würde den ganzen Chat-Verlauf mitkopieren.
+        # Verschachtelte Listen werden geteilt und dürfen nicht verändert werden.
+        data = dict(self.__dict__)
+        data.pop("_dirty", None)
+        return data
 
     @classmethod
     def from_dict(cls, data: dict) -> "Schadensmeldung":
@@ -114,11 +196,24 @@ class Schadensmeldung:
         for field_name in ['beteiligte_personen', 'zeugen', 'dokumente', 'chat_history', 'fotos']:
             if field_name not in data or data[field_name] is None:
                 data[field_name] = []
-        return cls(**data)
+        meldung = cls(**data)
+        meldung.mark_clean()
+        return meldung
+
+
+# Leichtgewichtige Kopfdaten für Listen (aus dem SQLite-Index)
+MeldungHeader = namedtuple(
+    "MeldungHeader", "id schadenstyp erstellt_am status erfassung_abgeschlossen"
+)
+
+# Felder der Übersicht "Meine Schadensmeldungen"
+MeldungSummary = namedtuple(
+    "MeldungSummary", "id schadenstyp erstellt_am status geschaetzter_betrag"
+)
 
 
 # Fragen-Flow für den Schadensmeldung Bot
-FRAGEN_FLOW = [
+_FRAGEN_FLOW_RAW = [
     {
         "id": "schadenstyp",
         "frage": "Um welche Art von Schaden handelt es sich?",
@@ -212,6 +307,7 @@ FRAGEN_FLOW = [
         "typ": "text",
         "feld": "kontakt_telefon",
         "pflicht": True,
+        "validator": "phone",
         "placeholder": "z.B. 079 123 45 67"
     },
     {
@@ -220,6 +316,7 @@ FRAGEN_FLOW = [
         "typ": "text",
         "feld": "kontakt_email",
         "pflicht": True,
+        "validator": "email",
         "placeholder": "ihre.email@beispiel.ch"
     },
     {
@@ -233,7 +330,7 @@ FRAGEN_FLOW = [
 ]
 
 # Zusätzliche Fragen für Motorfahrzeugschäden
-FAHRZEUG_FRAGEN = [
+_FAHRZEUG_FRAGEN_RAW = [
     {
         "id": "fahrzeug_kennzeichen",
         "frage": "Wie lautet das Kennzeichen Ihres Fahrzeugs?",
@@ -268,50 +365,396 @@ FAHRZEUG_FRAGEN = [
     }
 ]
 
+# Unveränderliche Sichten: die Fragen werden von allen Sessions geteilt
+FRAGEN_FLOW = tuple(types.MappingProxyType(f) for f in _FRAGEN_FLOW_RAW)
+FAHRZEUG_FRAGEN = tuple(types.MappingProxyType(f) for f in _FAHRZEUG_FRAGEN_RAW)
+
+# Position jeder Frage im Standard-Flow (Frage-ID -> Index)
+FRAGEN_INDEX = {f["id"]: i for i, f in enumerate(FRAGEN_FLOW)}
+
+
+@functools.cache
+def _ensure_dirs() -> None:
+    """Legt die Ablageverzeichnisse einmal pro Prozess an"""
+    CLAIMS_DIR.mkdir(parents=True, exist_ok=True)
+    FOTOS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# Kopfdaten direkt aus dem Dateianfang lesen (Fallback ohne SQLite-Index)
+HEADER_SNIFF_BYTES = 2048
+_HEADER_STR_RE = re.compile(r'"(erstellt_am|status|schadenstyp)":\s*"((?:[^"\\]|\\.)*)"')
+_HEADER_BOOL_RE = re.compile(r'"erfassung_abgeschlossen":\s*(true|false)')
+
 
 class SchadensmeldungManager:
-    """Verwaltet Schadensmeldungen"""
+    """Verwaltet Schadensmeldungen
+
+    Pro Meldung werden zwei Dateien geschrieben: ``{id}.json`` enthält die
+    Felder ohne Chat-Verlauf, ``{id}.chatlog.jsonl`` den Chat-Verlauf mit
+    einer Nachricht pro Zeile. So kostet eine neue Antwort nur ein Append
+    statt das ganze Transkript neu zu schreiben.
+
+    Mit ``CLAIMS_STORAGE_FORMAT=msgpack`` werden die Felder stattdessen als
+    ``{id}.mp`` abgelegt; vorhandene JSON-Dateien werden beim nächsten
+    Speichern migriert. ``export_json()`` liefert immer JSON.
+    """
+
+    HEADER_SUFFIXES = (".json", ".mp")
 
     def __init__(self, user_id: str = "default"):
+        _ensure_dirs()
+        self.user_id = user_id
         self.user_dir = CLAIMS_DIR / user_id
-        self.user_dir.mkdir(parents=True, exist_ok=True)
+        # Wird bei jeder Änderung erhöht (Cache-Schlüssel für die Übersicht)
+        self.version = 0
+        if not self.user_dir.exists():
+            self.user_dir.mkdir(parents=True, exist_ok=True)
+        use_msgpack = config.claims_storage_format == "msgpack" and MSGPACK_AVAILABLE
+        self.header_suffix = ".mp" if use_msgpack else ".json"
+        self.index_path = self.user_dir / "index.db"
+        self.index_ok = True
+        try:
+            self._init_index()
+        except sqlite3.Error as e:
+            print(f"Schadensmeldung-Index nicht verfügbar: {e}")
+            self.index_ok = False
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path)
+
+    def _init_index(self) -> None:
+        """Erstellt den Metadaten-Index und befüllt ihn beim ersten Mal"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "id TEXT PRIMARY KEY, erstellt_am TEXT, status TEXT, "
+                "schadenstyp TEXT, erfassung_abgeschlossen INTEGER, "
+                "geschaetzter_betrag REAL)"
+            )
+            spalten = {row[1] for row in conn.execute("PRAGMA table_info(claims)")}
+            neu_befuellen = "geschaetzter_betrag" not in spalten
+            if neu_befuellen:
+                # Index aus älterer Version: Spalte ergänzen und neu befüllen
+                conn.execute("ALTER TABLE claims ADD COLUMN geschaetzter_betrag REAL")
+            leer = conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0] == 0
+        if leer or neu_befuellen:
+            # Bestehende Meldungen (vor Einführung des Index) übernehmen
+            for meldung in self.list_all():
+                self._update_index(meldung)
+
+    def _update_index(self, meldung: Schadensmeldung) -> None:
+        if not self.index_ok:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO claims "
+                "(id, erstellt_am, status, schadenstyp, erfassung_abgeschlossen, geschaetzter_betrag) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (meldung.id, meldung.erstellt_am, meldung.status,
+                 meldung.schadenstyp, int(meldung.erfassung_abgeschlossen),
+                 meldung.geschaetzter_betrag)
+            )
+
+    def _chatlog_path(self, meldung_id: str) -> Path:
+        return self.user_dir / f"{meldung_id}.chatlog.jsonl"
+
+    def _header_path(self, meldung_id: str) -> Optional[Path]:
+        """Pfad der gespeicherten Felder (aktuelles Format zuerst, dann Altformat)"""
+        for suffix in (self.header_suffix,) + self.HEADER_SUFFIXES:
+            file_path = self.user_dir / f"{meldung_id}{suffix}"
+            if file_path.exists():
+                return file_path
+        return None
+
+    @staticmethod
+    def _read_header(file_path: Path) -> dict:
+        if file_path.suffix == ".mp":
+            if not MSGPACK_AVAILABLE:
+                raise ImportError(f"{file_path.name} ist im msgpack-Format gespeichert, msgpack ist aber nicht installiert")
+            return msgpack.unpackb(file_path.read_bytes(), raw=False)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _header_dateien(self):
+        """Alle Kopfdateien im User-Verzeichnis (os.scandir statt Path-Objekte pro Eintrag)"""
+        with os.scandir(self.user_dir) as it:
+            for entry in it:
+                if entry.name.endswith(self.HEADER_SUFFIXES) and entry.is_file():
+                    yield Path(entry.path)
 
     def save(self, meldung: Schadensmeldung) -> None:
-        """Speichert eine Schadensmeldung"""
+        """Speichert eine Schadensmeldung inkl. komplettem Chat-Verlauf"""
+        self.save_header(meldung)
+        self._write_chatlog(meldung)
+
+    def _write_chatlog(self, meldung: Schadensmeldung) -> None:
+        with open(self._chatlog_path(meldung.id), "w", encoding="utf-8") as f:
+            for msg in meldung.chat_history:
+                f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        self.version += 1
+
+    def save_header(self, meldung: Schadensmeldung) -> None:
+        """Speichert nur die Felder der Meldung (ohne Chat-Verlauf)
+
+        Unveränderte Meldungen (siehe ``Schadensmeldung.is_dirty``) werden
+        nicht erneut geschrieben.
+        """
+        if not meldung.is_dirty:
+            return
         meldung.aktualisiert_am = datetime.now().isoformat()
-        file_path = self.user_dir / f"{meldung.id}.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(meldung.to_dict(), f, ensure_ascii=False, indent=2)
+        _flush_saves()
+        self._migrate_chat(meldung)
+        self._write_header(meldung)
+        meldung.mark_clean()
+
+    def _migrate_chat(self, meldung: Schadensmeldung) -> None:
+        """Ältere Meldung: Verlauf aus dem JSON einmalig ins Chatlog übernehmen
+
+        Muss vor jedem Schreiben des Kopfs laufen, da dieser ohne Chat gespeichert wird.
+        """
+        if meldung.chat_history and not self._chatlog_path(meldung.id).exists():
+            self._write_chatlog(meldung)
+
+    def _write_header(self, meldung: Schadensmeldung) -> None:
+        data = meldung.to_dict()
+        data["chat_history"] = []
+        # Skalare Felder zuerst, Listen am Ende: so stehen die Kopfdaten
+        # in den ersten Bytes der Datei (siehe _sniff_header)
+        data = dict(sorted(data.items(), key=lambda item: isinstance(item[1], list)))
+        file_path = self.user_dir / f"{meldung.id}{self.header_suffix}"
+        if self.header_suffix == ".mp":
+            file_path.write_bytes(msgpack.packb(data, use_bin_type=True))
+        else:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        # Datei im anderen Format (vor einem Formatwechsel) entfernen
+        for suffix in self.HEADER_SUFFIXES:
+            if suffix != self.header_suffix:
+                (self.user_dir / f"{meldung.id}{suffix}").unlink(missing_ok=True)
+        self._update_index(meldung)
+        self.version += 1
+
+    def append_chat(self, meldung: Schadensmeldung, msgs: List[Dict]) -> None:
+        """Hängt neue Chat-Nachrichten an den Chat-Verlauf an"""
+        if not msgs:
+            return
+        chatlog_path = self._chatlog_path(meldung.id)
+        if not chatlog_path.exists() and meldung.chat_history:
+            # Ältere Meldung: bisherigen Verlauf zuerst ins Chatlog übernehmen
+            msgs = meldung.chat_history + msgs
+            meldung.chat_history = []
+        with open(chatlog_path, "a", encoding="utf-8") as f:
+            for msg in msgs:
+                f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        meldung.chat_history.extend(msgs)
+        self.version += 1
+
+    def sync_chat(self, meldung: Schadensmeldung, chat: List[Dict]) -> None:
+        """Bringt den gespeicherten Chat-Verlauf auf den Stand von ``chat``
+
+        Sind nur Nachrichten dazugekommen, werden diese angehängt. Wurde der
+        Verlauf gekürzt (z.B. über 'Zurück'), wird das Chatlog neu geschrieben.
+        """
+        gespeichert = meldung.chat_history
+        n = len(gespeichert)
+        if n == 0 or (len(chat) >= n and chat[n - 1] == gespeichert[-1]):
+            self.append_chat(meldung, chat[n:])
+        else:
+            meldung.chat_history = list(chat)
+            self._write_chatlog(meldung)
+
+    def _load_chat(self, meldung: Schadensmeldung) -> None:
+        """Liest den Chat-Verlauf aus dem Chatlog (falls vorhanden)"""
+        chatlog_path = self._chatlog_path(meldung.id)
+        if not chatlog_path.exists():
+            # Ältere Meldungen haben den Verlauf noch im JSON
+            return
+        with open(chatlog_path, "r", encoding="utf-8") as f:
+            meldung.chat_history = [json.loads(line) for line in f if line.strip()]
 
     def load(self, meldung_id: str) -> Optional[Schadensmeldung]:
         """Lädt eine Schadensmeldung"""
-        file_path = self.user_dir / f"{meldung_id}.json"
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                return Schadensmeldung.from_dict(json.load(f))
+        _flush_saves()
+        file_path = self._header_path(meldung_id)
+        if file_path:
+            try:
+                meldung = Schadensmeldung.from_dict(self._read_header(file_path))
+            except ImportError as e:
+                print(f"Fehler beim Laden der Schadensmeldung {meldung_id}: {e}")
+                return None
+            self._load_chat(meldung)
+            return meldung
         return None
 
+    def export_json(self, meldung_id: str) -> Optional[str]:
+        """Exportiert eine Meldung inkl. Chat-Verlauf als JSON (unabhängig vom Speicherformat)"""
+        meldung = self.load(meldung_id)
+        if meldung is None:
+            return None
+        return json.dumps(meldung.to_dict(), ensure_ascii=False, indent=2)
+
     def list_all(self) -> List[Schadensmeldung]:
         """Listet alle Schadensmeldungen des Users"""
+        _flush_saves()
         meldungen = []
-        for file_path in self.user_dir.glob("*.json"):
+        for file_path in self._header_dateien():
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    meldungen.append(Schadensmeldung.from_dict(json.load(f)))
+                meldung = Schadensmeldung.from_dict(self._read_header(file_path))
+                self._load_chat(meldung)
+                meldungen.append(meldung)
             except Exception:
                 continue
         meldungen.sort(key=lambda m: m.erstellt_am, reverse=True)
         return meldungen
 
+    def list_headers(self) -> List[MeldungHeader]:
+        """Listet die Kopfdaten aller Meldungen aus dem Index (ohne JSON zu lesen)"""
+        _flush_saves()
+        if not self.index_ok:
+            return self._scan_headers()
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT id, schadenstyp, erstellt_am, status, erfassung_abgeschlossen "
+                    "FROM claims ORDER BY erstellt_am DESC"
+                ).fetchall()
+        except sqlite3.Error:
+            return self._scan_headers()
+        return [
+            MeldungHeader(id_, typ, erstellt, status, bool(abgeschlossen))
+            for id_, typ, erstellt, status, abgeschlossen in rows
+        ]
+
+    def list_summary(self) -> List[MeldungSummary]:
+        """Listet die Felder der Übersicht aus dem Index (ohne Chat und Fotos)"""
+        _flush_saves()
+        if self.index_ok:
+            try:
+                with closing(self._connect()) as conn:
+                    rows = conn.execute(
+                        "SELECT id, schadenstyp, erstellt_am, status, geschaetzter_betrag "
+                        "FROM claims ORDER BY erstellt_am DESC"
+                    ).fetchall()
+                return [MeldungSummary(*row) for row in rows]
+            except sqlite3.Error:
+                pass
+        return [
+            MeldungSummary(m.id, m.schadenstyp, m.erstellt_am, m.status, m.geschaetzter_betrag)
+            for m in self.list_all()
+        ]
+
+    @staticmethod
+    def _sniff_header(file_path: Path) -> Optional[MeldungHeader]:
+        """Liest die Kopfdaten aus den ersten Bytes einer JSON-Datei"""
+        with open(file_path, "rb") as f:
+            head = f.read(HEADER_SNIFF_BYTES).decode("utf-8", errors="ignore")
+        werte = {key: json.loads(f'"{value}"') for key, value in _HEADER_STR_RE.findall(head)}
+        abgeschlossen = _HEADER_BOOL_RE.search(head)
+        if len(werte) < 3 or not abgeschlossen:
+            return None
+        return MeldungHeader(
+            file_path.stem, werte["schadenstyp"], werte["erstellt_am"],
+            werte["status"], abgeschlossen.group(1) == "true"
+        )
+
+    def _scan_headers(self) -> List[MeldungHeader]:
+        """Kopfdaten ohne Index: Dateianfang lesen, nur bei Bedarf ganz parsen"""
+        headers = []
+        for file_path in self._header_dateien():
+            try:
+                header = self._sniff_header(file_path) if file_path.suffix == ".json" else None
+                if header is None:
+                    data = self._read_header(file_path)
+                    header = MeldungHeader(
+                        data["id"], data.get("schadenstyp", ""), data["erstellt_am"],
+                        data.get("status", SchadensStatus.ENTWURF.value),
+                        bool(data.get("erfassung_abgeschlossen", False))
+                    )
+                headers.append(header)
+            except Exception:
+                continue
+        headers.sort(key=lambda h: h.erstellt_am, reverse=True)
+        return headers
+
     def delete(self, meldung_id: str) -> bool:
         """Löscht eine Schadensmeldung"""
-        file_path = self.user_dir / f"{meldung_id}.json"
-        if file_path.exists():
-            file_path.unlink()
+        _flush_saves()
+        file_path = self._header_path(meldung_id)
+        if file_path:
+            for suffix in self.HEADER_SUFFIXES:
+                (self.user_dir / f"{meldung_id}{suffix}").unlink(missing_ok=True)
+            chatlog_path = self._chatlog_path(meldung_id)
+            if chatlog_path.exists():
+                chatlog_path.unlink()
+            if self.index_ok:
+                with closing(self._connect()) as conn, conn:
+                    conn.execute("DELETE FROM claims WHERE id = ?", (meldung_id,))
+            self.version += 1
             return True
         return False
 
 
+# Hintergrund-Speicherung der Kopfdaten: pro Meldung wird nur der jeweils
+# neueste Stand geschrieben, schnelle Folgeklicks kosten einen Schreibvorgang.
+_save_q: "queue.Queue[None]" = queue.Queue()
+_save_pending: Dict[Tuple[Path, str], Tuple[SchadensmeldungManager, Schadensmeldung]] = {}
+_save_lock = threading.Lock()
+_write_lock = threading.Lock()
+_save_worker: Optional[threading.Thread] = None
+
+
+def _flush_saves() -> None:
+    """Schreibt alle ausstehenden Kopfdaten (in Einreihungsreihenfolge)"""
+    with _write_lock:
+        with _save_lock:
+            batch = list(_save_pending.values())
+            _save_pending.clear()
+        for manager, meldung in batch:
+            try:
+                manager._write_header(meldung)
+            except Exception as e:
+                print(f"Fehler beim Speichern der Schadensmeldung {meldung.id}: {e}")
+
+
+def _save_worker_loop() -> None:
+    while True:
+        _save_q.get()
+        _flush_saves()
+
+
+def speichere_im_hintergrund(manager: SchadensmeldungManager, meldung: Schadensmeldung) -> None:
+    """Reiht die Kopfdaten einer Meldung zum Speichern im Hintergrund ein"""
+    global _save_worker
+    if not meldung.is_dirty:
+        return
+
+    manager._migrate_chat(meldung)
+    meldung.aktualisiert_am = datetime.now().isoformat()
+    with _save_lock:
+        _save_pending[(manager.user_dir, meldung.id)] = (manager, replace(meldung))
+        if _save_worker is None:
+            _save_worker = threading.Thread(target=_save_worker_loop, daemon=True)
+            _save_worker.start()
+    manager.version += 1
+    meldung.mark_clean()
+    _save_q.put(None)
+
+
+atexit.register(_flush_saves)
+
+
+@st.cache_resource(show_spinner=False)
+def _manager_for(user_id: str) -> SchadensmeldungManager:
+    """Ein Manager pro User, über Reruns hinweg wiederverwendet"""
+    return SchadensmeldungManager(user_id)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_list_summary(user_id: str, version: int) -> List[MeldungSummary]:
+    """Übersicht eines Users, neu geladen sobald sich die Manager-Version ändert"""
+    return _manager_for(user_id).list_summary()
+
+
 def get_manager() -> SchadensmeldungManager:
     """Gibt Manager für aktuellen User zurück"""
     try:
@@ -320,7 +763,7 @@ def get_manager() -> SchadensmeldungManager:
         user_id = user.id if user else "default"
     except ImportError:
         user_id = "default"
-    return SchadensmeldungManager(user_id)
+    return _manager_for(user_id)
 
 
 def init_schaden_state():
@@ -335,23 +778,32 @@ def init_schaden_state():
         st.session_state.schaden_data = {}
 
 
-def get_aktuelle_fragen(schadenstyp: str) -> List[Dict]:
-    """Gibt die relevanten Fragen basierend auf Schadenstyp zurück"""
-    fragen = FRAGEN_FLOW.copy()
+def _reset_schaden_state(keep_meldung: bool = False) -> None:
+    """Setzt die laufende Erfassung zurück
 
+    Args:
+        keep_meldung: Aktuelle Meldung und erfasste Daten behalten (Bearbeiten)
+    """
+    if not keep_meldung:
+        st.session_state.aktuelle_meldung_id = None
+        st.session_state.schaden_data = {}
+    st.session_state.schaden_chat = []
+    st.session_state.schaden_step = 0
+    _reset_frage_registries()
+
+
+@functools.lru_cache(maxsize=None)
+def get_aktuelle_fragen(schadenstyp: str) -> Tuple[Mapping[str, Any], ...]:
+    """Gibt die relevanten Fragen basierend auf Schadenstyp zurück"""
     # Fahrzeug-Fragen einfügen nach Schadensbeschreibung
-    if schadenstyp == SchadensTyp.MOTORFAHRZEUG.value:
-        insert_idx = next(
-            (i for i, f in enumerate(fragen) if f["id"] == "geschaetzter_betrag"),
-            len(fragen)
-        )
-        for i, frage in enumerate(FAHRZEUG_FRAGEN):
-            fragen.insert(insert_idx + i, frage)
+    if schadenstyp == SchadensTyp.MOTORFAHRZEUG:
+        insert_idx = FRAGEN_INDEX["geschaetzter_betrag"]
+        return FRAGEN_FLOW[:insert_idx] + FAHRZEUG_FRAGEN + FRAGEN_FLOW[insert_idx:]
 
-    return fragen
+    return FRAGEN_FLOW
 
 
-def sollte_frage_zeigen(frage: Dict, daten: Dict) -> bool:
+def sollte_frage_zeigen(frage: Mapping[str, Any], daten: Dict) -> bool:
     """Prüft ob eine Frage basierend auf Bedingungen gezeigt werden soll"""
     # Bedingung für bestimmte Schadenstypen (z.B. Fotos nur bei relevanten Typen)
     if "bedingung_typ" in frage:
@@ -368,6 +820,78 @@ def sollte_frage_zeigen(frage: Dict, daten: Dict) -> bool:
     return feld_wert == bedingung["wert"]
 
 
+@functools.cache
+def _pil():
+    """Pillow mit registriertem HEIC-Opener, einmal pro Prozess eingerichtet"""
+    if HEIF_AVAILABLE:
+        register_heif_opener()
+    Image.init()
+    return Image
+
+
+def erstelle_vorschau(file) -> Optional[bytes]:
+    """Verkleinert ein hochgeladenes Bild auf eine kleine Vorschau (JPEG-Bytes)"""
+    try:
+        file.seek(0)
+        with _pil().open(file) as img:
+            img.thumbnail((VORSCHAU_GROESSE, VORSCHAU_GROESSE))
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, "JPEG", quality=80)
+        return buffer.getvalue()
+    except Exception:
+        return None
+    finally:
+        file.seek(0)
+
+
+def speichere_foto(file, meldung_id: str) -> Path:
+    """Speichert ein hochgeladenes Foto verkleinert als WebP"""
+    _ensure_dirs()
+    file.seek(0)
+    try:
+        with _pil().open(file) as original:
+            img = ImageOps.exif_transpose(original)
+            img.thumbnail((FOTO_MAX_KANTE, FOTO_MAX_KANTE))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGB")
+            foto_pfad = FOTOS_DIR / f"{meldung_id}_{uuid.uuid4().hex[:8]}.webp"
+            img.save(foto_pfad, "WEBP", quality=FOTO_WEBP_QUALITAET, method=4)
+        return foto_pfad
+    except OSError:
+        # Format nicht lesbar (z.B. HEIC ohne pillow-heif): Original speichern
+        file.seek(0)
+        foto_pfad = FOTOS_DIR / f"{meldung_id}_{uuid.uuid4().hex[:8]}_{file.name}"
+        with open(foto_pfad, "wb") as f:
+            shutil.copyfileobj(file, f, length=1024 * 1024)
+        return foto_pfad
+
+
+def _reset_frage_registries() -> None:
+    """Leert die Registries der gestellten Fragen und Validierungsfehler"""
+    st.session_state.setdefault("_fragen_gestellt", set()).clear()
+    st.session_state.setdefault("_validierungsfehler", {}).clear()
+
+
+def get_aktuelle_meldung(manager: SchadensmeldungManager) -> Optional[Schadensmeldung]:
+    """Gibt die aktive Meldung zurück; von Disk geladen wird nur bei ID-Wechsel"""
+    meldung_id = st.session_state.aktuelle_meldung_id
+    meldung = st.session_state.get("_meldung_obj")
+    if meldung is None or meldung.id != meldung_id:
+        meldung = manager.load(meldung_id)
+        st.session_state._meldung_obj = meldung
+    return meldung
+
+
+def get_total_fragen(fragen: Tuple[Mapping[str, Any], ...], daten: Dict) -> int:
+    """Anzahl sichtbarer Fragen, gecacht pro Kombination der Bedingungsfelder"""
+    # Nur Schadenstyp und Polizeibericht beeinflussen, welche Fragen gezeigt werden
+    cond_key = (daten.get("schadenstyp", ""), daten.get("polizeibericht", False))
+    cache = st.session_state.setdefault("_total_fragen_cache", {})
+    if cond_key not in cache:
+        cache[cond_key] = len([f for f in fragen if sollte_frage_zeigen(f, daten)])
+    return cache[cond_key]
+
+
 def render_schadensmeldung():
     """Rendert den Schadensmeldung-Bot"""
     init_schaden_state()
@@ -388,15 +912,14 @@ def render_schadensmeldung():
                 aktualisiert_am=datetime.now().isoformat()
             )
             manager.save(neue_meldung)
+            _reset_schaden_state()
             st.session_state.aktuelle_meldung_id = neue_meldung.id
-            st.session_state.schaden_chat = []
-            st.session_state.schaden_step = 0
-            st.session_state.schaden_data = {}
+            st.session_state._meldung_obj = neue_meldung
             st.rerun()
 
     with col2:
         # Entwürfe anzeigen
-        entwuerfe = [m for m in manager.list_all() if m.status == SchadensStatus.ENTWURF.value and not m.erfassung_abgeschlossen]
+        entwuerfe = [m for m in manager.list_headers() if m.status == SchadensStatus.ENTWURF and not m.erfassung_abgeschlossen]
         if entwuerfe:
             optionen = {m.id: f"{m.schadenstyp or 'Neu'} ({m.erstellt_am[:10]})" for m in entwuerfe}
             selected = st.selectbox(
@@ -407,17 +930,17 @@ def render_schadensmeldung():
             )
             if st.button("Fortsetzen"):
                 st.session_state.aktuelle_meldung_id = selected
-                meldung = manager.load(selected)
+                meldung = get_aktuelle_meldung(manager)
                 st.session_state.schaden_data = meldung.to_dict()
                 st.session_state.schaden_step = meldung.aktuelle_frage
-                st.session_state.schaden_chat = meldung.chat_history
+                st.session_state.schaden_chat = list(meldung.chat_history)
                 st.rerun()
 
     st.divider()
 
     # Aktive Erfassung
     if st.session_state.aktuelle_meldung_id:
-        meldung = manager.load(st.session_state.aktuelle_meldung_id)
+        meldung = get_aktuelle_meldung(manager)
 
         if meldung and not meldung.erfassung_abgeschlossen:
             render_erfassung_chat(meldung, manager)
@@ -450,7 +973,7 @@ def render_erfassung_chat(meldung: Schadensmeldung, manager: SchadensmeldungMana
     # Fortschrittsanzeige
     schadenstyp = st.session_state.schaden_data.get("schadenstyp", "")
     fragen = get_aktuelle_fragen(schadenstyp)
-    total_fragen = len([f for f in fragen if sollte_frage_zeigen(f, st.session_state.schaden_data)])
+    total_fragen = get_total_fragen(fragen, st.session_state.schaden_data)
     aktueller_step = st.session_state.schaden_step
 
     progress = min(aktueller_step / max(total_fragen, 1), 1.0)
@@ -489,11 +1012,11 @@ def render_erfassung_chat(meldung: Schadensmeldung, manager: SchadensmeldungMana
         aktuelle_frage = fragen[aktueller_step]
 
         # Frage stellen (falls noch nicht gestellt)
-        frage_key = f"frage_{aktuelle_frage['id']}_gestellt"
-        if frage_key not in st.session_state:
+        gestellt = st.session_state.setdefault("_fragen_gestellt", set())
+        if aktuelle_frage["id"] not in gestellt:
             bot_msg = {"role": "assistant", "content": aktuelle_frage["frage"]}
             st.session_state.schaden_chat.append(bot_msg)
-            st.session_state[frage_key] = True
+            gestellt.add(aktuelle_frage["id"])
             with st.chat_message("assistant"):
                 st.markdown(aktuelle_frage["frage"])
 
@@ -501,7 +1024,7 @@ def render_erfassung_chat(meldung: Schadensmeldung, manager: SchadensmeldungMana
         render_frage_eingabe(aktuelle_frage, meldung, manager, fragen)
 
 
-def render_frage_eingabe(frage: Dict, meldung: Schadensmeldung, manager: SchadensmeldungManager, fragen: List[Dict]):
+def render_frage_eingabe(frage: Mapping[str, Any], meldung: Schadensmeldung, manager: SchadensmeldungManager, fragen: Tuple[Mapping[str, Any], ...]):
     """Rendert die Eingabe für eine Frage"""
 
     frage_typ = frage["typ"]
@@ -579,10 +1102,23 @@ def render_frage_eingabe(frage: Dict, meldung: Schadensmeldung, manager: Schaden
 
         # Vorschau der neuen Uploads
         if uploaded_files:
+            # Vorschauen pro Upload nur einmal erzeugen (Bytes mit stabiler Media-URL)
+            bisher = st.session_state.get("_foto_vorschauen", {})
+            vorschauen = {}
             cols = st.columns(min(len(uploaded_files), 3))
             for i, file in enumerate(uploaded_files[:5]):  # Max 5 Fotos
                 with cols[i % 3]:
-                    st.image(file, caption=file.name, width=100)
+                    file_key = getattr(file, "file_id", file.name)
+                    if file_key in bisher:
+                        vorschauen[file_key] = bisher[file_key]
+                    else:
+                        vorschauen[file_key] = erstelle_vorschau(file)
+                    vorschau = vorschauen[file_key]
+                    if vorschau:
+                        st.image(vorschau, caption=file.name, width=100)
+                    else:
+                        st.caption(f"📎 {file.name}")
+            st.session_state._foto_vorschauen = vorschauen
 
         col1, col2 = st.columns(2)
         with col1:
@@ -590,11 +1126,7 @@ def render_frage_eingabe(frage: Dict, meldung: Schadensmeldung, manager: Schaden
                 foto_pfade = []
                 if uploaded_files:
                     for file in uploaded_files[:5]:  # Max 5 Fotos
-                        # Foto speichern
-                        foto_name = f"{meldung.id}_{uuid.uuid4().hex[:8]}_{file.name}"
-                        foto_pfad = FOTOS_DIR / foto_name
-                        with open(foto_pfad, "wb") as f:
-                            f.write(file.getbuffer())
+                        foto_pfad = speichere_foto(file, meldung.id)
                         foto_pfade.append(str(foto_pfad))
                 # Kombiniere existierende und neue Fotos
                 alle_fotos = existing_fotos + foto_pfade
@@ -611,50 +1143,45 @@ def render_frage_eingabe(frage: Dict, meldung: Schadensmeldung, manager: Schaden
             label_visibility="collapsed"
         )
 
-        # Validierungs-State für dieses Feld
-        validation_key = f"validation_error_{frage['id']}"
+        # Validierungsfehler aller Felder (Frage-ID -> Meldung)
+        validierungsfehler = st.session_state.setdefault("_validierungsfehler", {})
 
         # Zeige Validierungsfehler falls vorhanden
-        if validation_key in st.session_state and st.session_state[validation_key]:
-            st.error(st.session_state[validation_key])
+        if validierungsfehler.get(frage["id"]):
+            st.error(validierungsfehler[frage["id"]])
 
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
             if st.button("Weiter", key=f"confirm_{frage['id']}", disabled=not text.strip() if frage.get("pflicht") else False):
-                # Validierung für Telefon und E-Mail
-                feld = frage["feld"]
-                if feld in ['kontakt_telefon', 'kontakt_email'] and text.strip():
-                    is_valid, error_msg, corrected = generate_validation_response(feld, text)
+                # Validierung gemäss "validator" im Fragen-Flow (Telefon, E-Mail)
+                if frage.get("validator") and text.strip():
+                    is_valid, error_msg, corrected = generate_validation_response(frage["validator"], text)
                     if not is_valid:
-                        st.session_state[validation_key] = error_msg
+                        validierungsfehler[frage["id"]] = error_msg
                         st.rerun()
                     else:
                         # Validierung erfolgreich - Fehler löschen
-                        if validation_key in st.session_state:
-                            del st.session_state[validation_key]
+                        validierungsfehler.pop(frage["id"], None)
                         # Korrigierten Wert verwenden falls vorhanden
                         final_value = corrected if corrected else text
                         verarbeite_antwort(final_value, frage, meldung, manager)
                 else:
                     # Keine Validierung nötig
-                    if validation_key in st.session_state:
-                        del st.session_state[validation_key]
+                    validierungsfehler.pop(frage["id"], None)
                     verarbeite_antwort(text, frage, meldung, manager)
         with col2:
             if not frage.get("pflicht"):
                 if st.button("Überspringen", key=f"skip_{frage['id']}"):
-                    if validation_key in st.session_state:
-                        del st.session_state[validation_key]
+                    validierungsfehler.pop(frage["id"], None)
                     verarbeite_antwort("", frage, meldung, manager)
         with col3:
             if st.session_state.schaden_step > 0:
                 if st.button("⬅️ Zurück", key=f"back_{frage['id']}"):
-                    if validation_key in st.session_state:
-                        del st.session_state[validation_key]
+                    validierungsfehler.pop(frage["id"], None)
                     gehe_zurueck(meldung, manager)
 
 
-def verarbeite_antwort(antwort: Any, frage: Dict, meldung: Schadensmeldung, manager: SchadensmeldungManager):
+def verarbeite_antwort(antwort: Any, frage: Mapping[str, Any], meldung: Schadensmeldung, manager: SchadensmeldungManager):
     """Verarbeitet eine Antwort und geht zur nächsten Frage"""
 
     feld = frage["feld"]
@@ -676,12 +1203,14 @@ def verarbeite_antwort(antwort: Any, frage: Dict, meldung: Schadensmeldung, mana
 
     # Daten speichern
     st.session_state.schaden_data[feld] = antwort
+    if feld in ("schadenstyp", "polizeibericht"):
+        st.session_state.pop("_total_fragen_cache", None)
 
-    # Meldung aktualisieren
+    # Meldung aktualisieren (nur neue Chat-Nachrichten anhängen)
     setattr(meldung, feld, antwort)
     meldung.aktuelle_frage = st.session_state.schaden_step + 1
-    meldung.chat_history = st.session_state.schaden_chat
-    manager.save(meldung)
+    manager.sync_chat(meldung, st.session_state.schaden_chat)
+    speichere_im_hintergrund(manager, meldung)
 
     # Nächste Frage
     st.session_state.schaden_step += 1
@@ -691,9 +1220,7 @@ def verarbeite_antwort(antwort: Any, frage: Dict, meldung: Schadensmeldung, mana
     fragen = get_aktuelle_fragen(schadenstyp)
     if st.session_state.schaden_step < len(fragen):
         next_frage = fragen[st.session_state.schaden_step]
-        next_key = f"frage_{next_frage['id']}_gestellt"
-        if next_key in st.session_state:
-            del st.session_state[next_key]
+        st.session_state.setdefault("_fragen_gestellt", set()).discard(next_frage["id"])
 
     st.rerun()
 
@@ -712,13 +1239,11 @@ def gehe_zurueck(meldung: Schadensmeldung, manager: SchadensmeldungManager):
         fragen = get_aktuelle_fragen(schadenstyp)
         if st.session_state.schaden_step < len(fragen):
             frage = fragen[st.session_state.schaden_step]
-            frage_key = f"frage_{frage['id']}_gestellt"
-            if frage_key in st.session_state:
-                del st.session_state[frage_key]
+            st.session_state.setdefault("_fragen_gestellt", set()).discard(frage["id"])
 
         meldung.aktuelle_frage = st.session_state.schaden_step
-        meldung.chat_history = st.session_state.schaden_chat
-        manager.save(meldung)
+        manager.sync_chat(meldung, st.session_state.schaden_chat)
+        manager.save_header(meldung)
 
         st.rerun()
 
@@ -727,13 +1252,14 @@ def finalisiere_meldung(meldung: Schadensmeldung, manager: SchadensmeldungManage
     """Finalisiert die Schadensmeldung"""
 
     # Alle Daten in Meldung übertragen
+    # Der Chat-Verlauf kommt aus schaden_chat (sync_chat), nicht aus schaden_data
     for key, value in st.session_state.schaden_data.items():
-        if hasattr(meldung, key):
+        if key != "chat_history" and hasattr(meldung, key):
             setattr(meldung, key, value)
 
     meldung.erfassung_abgeschlossen = True
-    meldung.chat_history = st.session_state.schaden_chat
-    manager.save(meldung)
+    manager.sync_chat(meldung, st.session_state.schaden_chat)
+    manager.save_header(meldung)
 
     # Abschlussnachricht
     bot_msg = {
@@ -836,6 +1362,62 @@ def render_risk_analysis(meldung: Schadensmeldung):
             """)
 
 
+@st.cache_data(show_spinner=False, max_entries=256)
+def _load_thumbnail(path: str, mtime: float, max_width: int = 400) -> bytes:
+    """Verkleinertes JPEG eines Fotos; mtime im Schlüssel verwirft veraltete Einträge"""
+    with _pil().open(path) as original:
+        img = ImageOps.exif_transpose(original)
+        img.thumbnail((max_width, max_width))
+        buffer = io.BytesIO()
+        img.convert("RGB").save(buffer, "JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def _render_lazy_photo(foto_pfad: str, key: str, sofort: bool = False):
+    """Zeigt ein Foto erst nach Klick auf 'Anzeigen' (oder sofort) an"""
+    geoeffnet = st.session_state.setdefault("photos_expanded", set())
+    name = os.path.basename(foto_pfad)
+    if not (sofort or foto_pfad in geoeffnet):
+        st.caption(f"📷 {name}")
+        if not st.button("Anzeigen", key=key):
+            return
+        geoeffnet.add(foto_pfad)
+    try:
+        st.image(_load_thumbnail(foto_pfad, os.path.getmtime(foto_pfad)), use_container_width=True)
+        st.caption(name)
+    except Exception:
+        st.caption(f"📎 {name}")
+
+
+@st.fragment
+def _foto_galerie(fotos: List[str], key: str, seitengroesse: Optional[int] = None):
+    """Foto-Raster; Klicks auf 'Anzeigen' oder Blättern laden nur diesen Bereich neu"""
+    start = 0
+    if seitengroesse and len(fotos) > seitengroesse:
+        seiten = (len(fotos) - 1) // seitengroesse + 1
+        page_key = f"foto_page_{key}"
+        page = min(st.session_state.setdefault(page_key, 0), seiten - 1)
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Zurück", key=f"{page_key}_zurueck", disabled=page == 0):
+                page -= 1
+        with col3:
+            if st.button("Weiter ➡️", key=f"{page_key}_weiter", disabled=page >= seiten - 1):
+                page += 1
+        with col2:
+            st.caption(f"Seite {page + 1} von {seiten}")
+        st.session_state[page_key] = page
+
+        start = page * seitengroesse
+        fotos = fotos[start:start + seitengroesse]
+
+    cols = st.columns(min(len(fotos), 3))
+    for i, foto_pfad in enumerate(fotos):
+        with cols[i % 3]:
+            _render_lazy_photo(foto_pfad, f"foto_{key}_{start + i}", sofort=(i == 0))
+
+
 def render_zusammenfassung(meldung: Schadensmeldung, manager: SchadensmeldungManager):
     """Zeigt die Zusammenfassung einer abgeschlossenen Erfassung"""
 
@@ -846,51 +1428,49 @@ def render_zusammenfassung(meldung: Schadensmeldung, manager: SchadensmeldungMan
 
     with col1:
         with st.container(border=True):
-            st.markdown("**📋 Schadensdetails**")
-            st.write(f"**Typ:** {meldung.schadenstyp}")
-            st.write(f"**Datum:** {meldung.schadensdatum}")
-            if meldung.schadenszeit:
-                st.write(f"**Zeit:** {meldung.schadenszeit}")
-            st.write(f"**Ort:** {meldung.schadensort}")
-            if meldung.geschaetzter_betrag:
-                st.write(f"**Geschätzter Betrag:** CHF {meldung.geschaetzter_betrag:,.2f}")
+            zeilen = [
+                "**📋 Schadensdetails**",
+                f"**Typ:** {meldung.schadenstyp}",
+                f"**Datum:** {meldung.schadensdatum}",
+                f"**Zeit:** {meldung.schadenszeit}" if meldung.schadenszeit else None,
+                f"**Ort:** {meldung.schadensort}",
+                f"**Geschätzter Betrag:** CHF {meldung.geschaetzter_betrag:,.2f}"
+                if meldung.geschaetzter_betrag else None,
+            ]
+            st.markdown("  \n".join(z for z in zeilen if z))
 
     with col2:
         with st.container(border=True):
-            st.markdown("**📞 Kontakt**")
-            st.write(f"**Telefon:** {meldung.kontakt_telefon}")
-            st.write(f"**E-Mail:** {meldung.kontakt_email}")
-            if meldung.bevorzugte_kontaktzeit:
-                st.write(f"**Erreichbar:** {meldung.bevorzugte_kontaktzeit}")
-            st.write(f"**Polizeimeldung:** {'Ja' if meldung.polizeibericht else 'Nein'}")
+            zeilen = [
+                "**📞 Kontakt**",
+                f"**Telefon:** {meldung.kontakt_telefon}",
+                f"**E-Mail:** {meldung.kontakt_email}",
+                f"**Erreichbar:** {meldung.bevorzugte_kontaktzeit}" if meldung.bevorzugte_kontaktzeit else None,
+                f"**Polizeimeldung:** {'Ja' if meldung.polizeibericht else 'Nein'}",
+            ]
+            st.markdown("  \n".join(z for z in zeilen if z))
 
     with st.container(border=True):
         st.markdown("**📝 Beschreibung**")
         st.write(meldung.schadensbeschreibung)
 
     # Fahrzeugdaten falls vorhanden
-    if meldung.schadenstyp == SchadensTyp.MOTORFAHRZEUG.value and meldung.fahrzeug_kennzeichen:
+    if meldung.schadenstyp == SchadensTyp.MOTORFAHRZEUG and meldung.fahrzeug_kennzeichen:
         with st.container(border=True):
-            st.markdown("**🚗 Fahrzeugdaten**")
-            st.write(f"**Kennzeichen:** {meldung.fahrzeug_kennzeichen}")
-            if meldung.fahrzeug_marke:
-                st.write(f"**Fahrzeug:** {meldung.fahrzeug_marke}")
-            if meldung.gegner_kennzeichen:
-                st.write(f"**Gegner-Kennzeichen:** {meldung.gegner_kennzeichen}")
-            if meldung.gegner_versicherung:
-                st.write(f"**Gegner-Versicherung:** {meldung.gegner_versicherung}")
+            zeilen = [
+                "**🚗 Fahrzeugdaten**",
+                f"**Kennzeichen:** {meldung.fahrzeug_kennzeichen}",
+                f"**Fahrzeug:** {meldung.fahrzeug_marke}" if meldung.fahrzeug_marke else None,
+                f"**Gegner-Kennzeichen:** {meldung.gegner_kennzeichen}" if meldung.gegner_kennzeichen else None,
+                f"**Gegner-Versicherung:** {meldung.gegner_versicherung}" if meldung.gegner_versicherung else None,
+            ]
+            st.markdown("  \n".join(z for z in zeilen if z))
 
     # Hochgeladene Fotos anzeigen
     if meldung.fotos and len(meldung.fotos) > 0:
         with st.container(border=True):
             st.markdown(f"**📸 Fotos ({len(meldung.fotos)})**")
-            cols = st.columns(min(len(meldung.fotos), 3))
-            for i, foto_pfad in enumerate(meldung.fotos[:6]):  # Max 6 anzeigen
-                with cols[i % 3]:
-                    try:
-                        st.image(foto_pfad, use_container_width=True)
-                    except Exception:
-                        st.caption(f"📎 {Path(foto_pfad).name}")
+            _foto_galerie(meldung.fotos[:6], f"zf_{meldung.id}")  # Max 6 anzeigen
 
     # === FUZZY RISK ANALYSE ===
     render_risk_analysis(meldung)
@@ -903,36 +1483,87 @@ def render_zusammenfassung(meldung: Schadensmeldung, manager: SchadensmeldungMan
     with col1:
         if st.button("📤 Meldung einreichen", type="primary", use_container_width=True):
             meldung.status = SchadensStatus.EINGEREICHT.value
-            manager.save(meldung)
+            manager.save_header(meldung)
             st.success("✅ Ihre Schadensmeldung wurde eingereicht! Sie erhalten in Kürze eine Bestätigung.")
-            st.session_state.aktuelle_meldung_id = None
-            st.session_state.schaden_chat = []
-            st.session_state.schaden_data = {}
-            st.session_state.schaden_step = 0
+            _reset_schaden_state()
 
     with col2:
         if st.button("✏️ Bearbeiten", use_container_width=True):
             meldung.erfassung_abgeschlossen = False
             meldung.aktuelle_frage = 0
+            meldung.chat_history = []
             manager.save(meldung)
-            st.session_state.schaden_step = 0
-            st.session_state.schaden_chat = []
-            # Alle Frage-gestellt Flags zurücksetzen
-            keys_to_delete = [k for k in st.session_state.keys() if k.startswith("frage_") and k.endswith("_gestellt")]
-            for k in keys_to_delete:
-                del st.session_state[k]
+            _reset_schaden_state(keep_meldung=True)
             st.rerun()
 
     with col3:
         if st.button("🗑️ Verwerfen", use_container_width=True):
             manager.delete(meldung.id)
-            st.session_state.aktuelle_meldung_id = None
-            st.session_state.schaden_chat = []
-            st.session_state.schaden_data = {}
-            st.session_state.schaden_step = 0
+            _reset_schaden_state()
             st.rerun()
 
 
+@st.fragment
+def _meldungen_fragment(meldungen: List[MeldungSummary]):
+    """Filter und Liste; Filteränderungen laden nur diesen Bereich neu"""
+    # Filter
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        status_filter = st.multiselect(
+            "Status filtern",
+            options=list(SchadensStatus),
+            default=list(SchadensStatus),
+            format_func=lambda s: s.value,
+            key="status_filter"
+        )
+
+    # Gefilterte Meldungen (Liste kommt bereits nach erstellt_am sortiert)
+    status_set = frozenset(status_filter)
+    gefiltert = [m for m in meldungen if m.status in status_set]
+
+    st.caption(f"{len(gefiltert)} Schadensmeldung(en)")
+
+    if not gefiltert:
+        return
+
+    # Ganze Liste als eine Tabelle statt Spalten-Widgets pro Zeile
+    zeilen = []
+    for meldung in gefiltert:
+        typ = meldung.schadenstyp or "Nicht angegeben"
+        betrag = (f"<b>CHF {meldung.geschaetzter_betrag:,.0f}</b>"
+                  if meldung.geschaetzter_betrag else "Betrag offen")
+        zeilen.append(
+            f"<tr><td><b>{_TYP_EMOJI.get(meldung.schadenstyp, '📋')} {escape(typ)}</b></td>"
+            f"<td>{escape(meldung.erstellt_am[:10])}</td>"
+            f"<td>{_STATUS_FARBE.get(meldung.status, '⚪')} {escape(meldung.status)}</td>"
+            f"<td>{betrag}</td></tr>"
+        )
+    st.markdown(
+        "<table class='meldungen' style='width: 100%;'>"
+        "<tr><th>Schadenstyp</th><th>Erstellt</th><th>Status</th><th>Betrag</th></tr>"
+        + "".join(zeilen) + "</table>",
+        unsafe_allow_html=True
+    )
+
+    # Ein Auswahlfeld + Button statt eines Buttons pro Zeile
+    nach_id = {m.id: m for m in gefiltert}
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        auswahl = st.selectbox(
+            "Meldung öffnen",
+            options=list(nach_id),
+            format_func=lambda mid: f"{nach_id[mid].schadenstyp or 'Nicht angegeben'} "
+                                    f"vom {nach_id[mid].erstellt_am[:10]} ({nach_id[mid].status})",
+            key="details_auswahl",
+            label_visibility="collapsed"
+        )
+    with col2:
+        if st.button("Details", key="details_oeffnen", use_container_width=True):
+            st.session_state.detail_meldung_id = auswahl
+            # Detail-Ansicht liegt ausserhalb des Fragments: ganze Seite neu laden
+            st.rerun(scope="app")
+
+
 def render_schadensmeldungen_liste():
     """Zeigt alle Schadensmeldungen des Benutzers"""
     init_schaden_state()
@@ -940,7 +1571,7 @@ def render_schadensmeldungen_liste():
 
     st.markdown("## 📁 Meine Schadensmeldungen")
 
-    meldungen = manager.list_all()
+    meldungen = _cached_list_summary(manager.user_id, manager.version)
 
     if not meldungen:
         st.info("Sie haben noch keine Schadensmeldungen erfasst.")
@@ -949,59 +1580,7 @@ def render_schadensmeldungen_liste():
             st.rerun()
         return
 
-    # Filter
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        status_filter = st.multiselect(
-            "Status filtern",
-            options=[s.value for s in SchadensStatus],
-            default=[s.value for s in SchadensStatus],
-            key="status_filter"
-        )
-
-    # Gefilterte Meldungen
-    gefiltert = [m for m in meldungen if m.status in status_filter]
-
-    st.caption(f"{len(gefiltert)} Schadensmeldung(en)")
-
-    for meldung in gefiltert:
-        with st.container(border=True):
-            col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-
-            with col1:
-                typ_emoji = {
-                    "Motorfahrzeug": "🚗",
-                    "Hausrat": "🏠",
-                    "Gebäude": "🏢",
-                    "Haftpflicht": "⚖️",
-                    "Reise": "✈️",
-                    "Rechtsschutz": "📜",
-                    "Unfall": "🚑",
-                    "Andere": "📋"
-                }.get(meldung.schadenstyp, "📋")
-
-                st.markdown(f"**{typ_emoji} {meldung.schadenstyp or 'Nicht angegeben'}**")
-                st.caption(f"Erstellt: {meldung.erstellt_am[:10]}")
-
-            with col2:
-                status_farbe = {
-                    SchadensStatus.ENTWURF.value: "🟡",
-                    SchadensStatus.EINGEREICHT.value: "🔵",
-                    SchadensStatus.IN_BEARBEITUNG.value: "🟠",
-                    SchadensStatus.ABGESCHLOSSEN.value: "🟢"
-                }.get(meldung.status, "⚪")
-                st.markdown(f"{status_farbe} {meldung.status}")
-
-            with col3:
-                if meldung.geschaetzter_betrag:
-                    st.markdown(f"**CHF {meldung.geschaetzter_betrag:,.0f}**")
-                else:
-                    st.caption("Betrag offen")
-
-            with col4:
-                if st.button("Details", key=f"details_{meldung.id}"):
-                    st.session_state.detail_meldung_id = meldung.id
-                    st.rerun()
+    _meldungen_fragment(meldungen)
 
     # Detail-Ansicht
     if "detail_meldung_id" in st.session_state and st.session_state.detail_meldung_id:
@@ -1033,18 +1612,24 @@ def render_detail_ansicht(meldung: Schadensmeldung, manager: SchadensmeldungMana
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("**Grunddaten**")
-            st.write(f"- **ID:** {meldung.id}")
-            st.write(f"- **Status:** {meldung.status}")
-            st.write(f"- **Policennummer:** {meldung.polizennummer or 'Nicht angegeben'}")
-            st.write(f"- **Schadensdatum:** {meldung.schadensdatum}")
-            st.write(f"- **Schadensort:** {meldung.schadensort}")
+            st.markdown("\n".join([
+                "**Grunddaten**",
+                "",
+                f"- **ID:** {meldung.id}",
+                f"- **Status:** {meldung.status}",
+                f"- **Policennummer:** {meldung.polizennummer or 'Nicht angegeben'}",
+                f"- **Schadensdatum:** {meldung.schadensdatum}",
+                f"- **Schadensort:** {meldung.schadensort}",
+            ]))
 
         with col2:
-            st.markdown("**Kontakt**")
-            st.write(f"- **Telefon:** {meldung.kontakt_telefon}")
-            st.write(f"- **E-Mail:** {meldung.kontakt_email}")
-            st.write(f"- **Erreichbar:** {meldung.bevorzugte_kontaktzeit or 'Keine Angabe'}")
+            st.markdown("\n".join([
+                "**Kontakt**",
+                "",
+                f"- **Telefon:** {meldung.kontakt_telefon}",
+                f"- **E-Mail:** {meldung.kontakt_email}",
+                f"- **Erreichbar:** {meldung.bevorzugte_kontaktzeit or 'Keine Angabe'}",
+            ]))
 
         st.markdown("**Beschreibung**")
         st.write(meldung.schadensbeschreibung or "Keine Beschreibung")
@@ -1058,14 +1643,7 @@ def render_detail_ansicht(meldung: Schadensmeldung, manager: SchadensmeldungMana
     if has_fotos:
         with tab2:
             st.markdown(f"**{len(meldung.fotos)} Foto(s) hochgeladen**")
-            cols = st.columns(3)
-            for i, foto_pfad in enumerate(meldung.fotos):
-                with cols[i % 3]:
-                    try:
-                        st.image(foto_pfad, use_container_width=True)
-                        st.caption(Path(foto_pfad).name)
-                    except Exception:
-                        st.caption(f"📎 {Path(foto_pfad).name}")
+            _foto_galerie(meldung.fotos, meldung.id, seitengroesse=FOTOS_PRO_SEITE)
 
     with tab3:
         if meldung.chat_history:
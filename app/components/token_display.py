@@ -5,10 +5,10 @@ Zeigt Token-Nutzung und verbleibende Kapazität an
 
 import streamlit as st
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TokenInfo:
     """Token-Informationen für Anzeige"""
     prompt_tokens: int = 0
@@ -17,14 +17,13 @@ class TokenInfo:
     context_size: int = 16384
     model: str = ""
     provider: str = ""
+    remaining: int = field(init=False, repr=False, compare=False)
+    usage_percent: float = field(init=False, repr=False, compare=False)
 
-    @property
-    def remaining(self) -> int:
-        return max(0, self.context_size - self.total_tokens)
-
-    @property
-    def usage_percent(self) -> float:
-        return min(100, (self.total_tokens / self.context_size) * 100)
+    def __post_init__(self):
+        # Abgeleitete Werte einmal berechnen (Instanz ist unveränderlich)
+        object.__setattr__(self, "remaining", max(0, self.context_size - self.total_tokens))
+        object.__setattr__(self, "usage_percent", min(100, (self.total_tokens / self.context_size) * 100))
 
 
 def init_token_state():
@@ -57,6 +56,69 @@ def update_token_info(
     st.session_state.session_total_tokens += total_tokens
 
 
+def _usage_color(usage: float) -> str:
+    """Farbcodierung basierend auf Nutzung"""
+    if usage < 50:
+        return "#22c55e"  # Gruen
+    elif usage < 80:
+        return "#f59e0b"  # Orange
+    return "#ef4444"  # Rot
+
+
+# Statische Styles der Token-Anzeige (einmal pro Seite über inject_token_css)
+TOKEN_DISPLAY_CSS = """
+<style>
+.token-bar {
+    display: flex; align-items: center; gap: 12px; padding: 8px 12px;
+    background: #f8f9fa; border-radius: 8px; font-size: 12px; color: #6b7280;
+}
+.token-bar .token-free { color: var(--c); font-weight: 600; }
+.token-progress { background: #e5e7eb; border-radius: 4px; height: 8px; margin-top: 8px; }
+.token-progress .bar-inner { background: var(--c); width: var(--w); height: 100%; border-radius: 4px; }
+.token-scale {
+    display: flex; justify-content: space-between; font-size: 11px; color: #9ca3af; margin-top: 4px;
+}
+</style>
+"""
+
+
+def inject_token_css():
+    """Injiziert das CSS der Token-Anzeige in Streamlit."""
+    st.markdown(TOKEN_DISPLAY_CSS, unsafe_allow_html=True)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _build_token_html(
+    prompt: int,
+    completion: int,
+    total: int,
+    ctx: int,
+    compact: bool,
+    model: str = ""
+) -> str:
+    """Baut das HTML der Token-Anzeige (gecacht, ändert sich nur pro LLM-Aufruf)"""
+    info = TokenInfo(prompt, completion, total, ctx, model)
+    usage = info.usage_percent
+    color = _usage_color(usage)
+
+    if compact:
+        # Kompakte Anzeige: eine Zeile
+        return (
+            f'<div class="token-bar" style="--c: {color};">'
+            f'<span class="token-free">{info.remaining:,} Tokens frei</span><span>|</span>'
+            f'<span>Verwendet: {total:,} ({usage:.0f}%)</span><span>|</span>'
+            f'<span>In: {prompt:,} / Out: {completion:,}</span></div>'
+        )
+
+    # Progress Bar der detaillierten Anzeige
+    return (
+        f'<div class="token-progress" style="--c: {color}; --w: {min(usage, 100)}%;">'
+        f'<div class="bar-inner"></div></div>'
+        f'<div class="token-scale"><span>0</span>'
+        f'<span>Kontext: {ctx:,} Tokens ({model})</span><span>{ctx:,}</span></div>'
+    )
+
+
 def render_token_display(compact: bool = True):
     """
     Rendert die Token-Anzeige
@@ -72,28 +134,11 @@ def render_token_display(compact: bool = True):
         return
 
     if compact:
-        # Kompakte Anzeige: eine Zeile
-        remaining = info.remaining
-        usage = info.usage_percent
-
-        # Farbcodierung basierend auf Nutzung
-        if usage < 50:
-            color = "#22c55e"  # Gruen
-        elif usage < 80:
-            color = "#f59e0b"  # Orange
-        else:
-            color = "#ef4444"  # Rot
-
-        st.markdown(f"""
-        <div style="display: flex; align-items: center; gap: 12px; padding: 8px 12px;
-                    background: #f8f9fa; border-radius: 8px; font-size: 12px; color: #6b7280;">
-            <span style="color: {color}; font-weight: 600;">{remaining:,} Tokens frei</span>
-            <span>|</span>
-            <span>Verwendet: {info.total_tokens:,} ({usage:.0f}%)</span>
-            <span>|</span>
-            <span>In: {info.prompt_tokens:,} / Out: {info.completion_tokens:,}</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(
+            _build_token_html(info.prompt_tokens, info.completion_tokens,
+                              info.total_tokens, info.context_size, True),
+            unsafe_allow_html=True
+        )
 
     else:
         # Detaillierte Anzeige
@@ -129,25 +174,11 @@ def render_token_display(compact: bool = True):
                 help="Tokens in der Antwort"
             )
 
-        # Progress Bar
-        usage = info.usage_percent
-        if usage < 50:
-            bar_color = "#22c55e"
-        elif usage < 80:
-            bar_color = "#f59e0b"
-        else:
-            bar_color = "#ef4444"
-
-        st.markdown(f"""
-        <div style="background: #e5e7eb; border-radius: 4px; height: 8px; margin-top: 8px;">
-            <div style="background: {bar_color}; width: {min(usage, 100)}%; height: 100%; border-radius: 4px;"></div>
-        </div>
-        <div style="display: flex; justify-content: space-between; font-size: 11px; color: #9ca3af; margin-top: 4px;">
-            <span>0</span>
-            <span>Kontext: {info.context_size:,} Tokens ({info.model})</span>
-            <span>{info.context_size:,}</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(
+            _build_token_html(info.prompt_tokens, info.completion_tokens,
+                              info.total_tokens, info.context_size, False, info.model),
+            unsafe_allow_html=True
+        )
 
 
 def render_session_stats():
@@ -20,33 +20,46 @@ UPLOADS_DIR = DATA_DIR / "uploads"
 KNOWLEDGE_BASES_DIR = DATA_DIR / "knowledge_bases"
 CHROMA_DB_DIR = DATA_DIR / "chroma_db"
 
-# Verzeichnisse erstellen falls nicht vorhanden
-for dir_path in [UPLOADS_DIR, KNOWLEDGE_BASES_DIR, CHROMA_DB_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+_app_initialized = False
 
 
-class LLMProvider(Enum):
+def _ensure_dirs():
+    """Erstellt die Datenverzeichnisse falls nicht vorhanden"""
+    for dir_path in [UPLOADS_DIR, KNOWLEDGE_BASES_DIR, CHROMA_DB_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+
+def init_app_config():
+    """Einmalige Initialisierung beim App-Start (Verzeichnisse anlegen)"""
+    global _app_initialized
+    if _app_initialized:
+        return
+    _ensure_dirs()
+    _app_initialized = True
+
+
+class LLMProvider(str, Enum):
     """Verfügbare LLM-Anbieter (nur Cloud APIs)"""
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     GOOGLE = "google"
 
 
-class STTProvider(Enum):
+class STTProvider(str, Enum):
     """Verfügbare Speech-to-Text Anbieter"""
     WHISPER_LOCAL = "whisper_local"      # Lokales (faster-whisper)
     WHISPER_OPENAI = "whisper_openai"    # OpenAI Whisper API
     GOOGLE = "google"                     # Google Cloud Speech-to-Text (Schweizerdeutsch!)
 
 
-class EmbeddingMode(Enum):
+class EmbeddingMode(str, Enum):
     """Embedding-Modus für RAG"""
     LOCAL_ONLY = "local"           # Nur lokales Modell (Ollama)
     API_ONLY = "api"               # Nur OpenAI API
     BOTH = "both"                  # Beide Modelle (Standard für neue Dokumente)
 
 
-class UserRole(Enum):
+class UserRole(str, Enum):
     """Benutzerrollen"""
     ADMIN = "admin"
     POWER_USER = "power_user"
@@ -125,6 +138,12 @@ class EmbeddingConfig:
     # Cloud via OpenAI
     openai_model: str = "text-embedding-3-small"
     openai_dimensions: int = 1536
+    # Grosse Embedding-Aufträge in mehrere Requests aufteilen (API-Limits) und parallel senden
+    max_batch_tokens: int = 200_000  # geschätzt als len(text) // 4
+    max_batch_inputs: int = 2048
+    max_parallel_requests: int = 8
+    # Embedding-Cache auf Disk (gleicher Text + Modell -> kein erneuter API-Aufruf), 0 = aus
+    cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX", "100000"))
 
     # Embedding-Modus: local, api, oder both
     mode: EmbeddingMode = EmbeddingMode.BOTH
@@ -146,6 +165,10 @@ class RAGConfig:
     # 100 Zeichen Überlappung (~12.5%) - verhindert Informationsverlust an Chunk-Grenzen
     chunk_overlap: int = 100
 
+    # OCR für Bild-PDFs: Seiten parallel durch Tesseract, fast_ocr rendert mit 200 statt 300 DPI
+    ocr_parallel_workers: int = int(os.getenv("OCR_PARALLEL_WORKERS", str(os.cpu_count() or 1)))
+    fast_ocr: bool = os.getenv("FAST_OCR", "false").lower() == "true"
+
     # Suchparameter - Differenziert nach LLM-Typ
     # Lokale Modelle (Ollama) haben kleinere Kontextfenster (8k-32k Tokens)
     top_k_local: int = 5
@@ -204,9 +227,13 @@ class AppConfig:
     # Performance
     response_timeout_local: int = 5  # Sekunden
     response_timeout_api: int = 3  # Sekunden
+    cbr_update_batch: int = int(os.getenv("CBR_UPDATE_BATCH", "250"))  # Cases pro ChromaDB-Update
     
     # Sprache
     language: str = "de"
+
+    # Speicherformat der Schadensmeldungen: "json" (Standard) oder "msgpack"
+    claims_storage_format: str = os.getenv("CLAIMS_STORAGE_FORMAT", "json").lower()
     
     # Debug-Modus
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
@@ -259,9 +286,17 @@ SUPPORTED_FORMATS = {
 }
 
 # Alle unterstützten Erweiterungen
-ALL_EXTENSIONS = []
-for category in SUPPORTED_FORMATS.values():
-    ALL_EXTENSIONS.extend(category["extensions"])
+ALL_EXTENSIONS = frozenset(
+    ext for info in SUPPORTED_FORMATS.values() for ext in info["extensions"]
+)
+
+# Direkte Zuordnung Erweiterung/MIME-Type -> Kategorie
+EXTENSION_TO_CATEGORY = {
+    ext: category for category, info in SUPPORTED_FORMATS.items() for ext in info["extensions"]
+}
+MIME_TO_CATEGORY = {
+    mime: category for category, info in SUPPORTED_FORMATS.items() for mime in info["mime_types"]
+}
 
 
 # Standard-Wissensbasen für Baloise
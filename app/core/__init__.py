@@ -1,9 +1,25 @@
 """KMU Knowledge Assistant - Core Module"""
 
-from app.core.llm_provider import llm_provider, UnifiedLLMProvider, LLMResponse
-from app.core.embeddings import embedding_provider, EmbeddingResult
-from app.core.document_processor import document_processor, ProcessedDocument, DocumentChunk
-from app.core.rag_engine import rag_engine, RAGEngine, KnowledgeBase, SearchResult
+import importlib
+import sys
+import types
+
+# Attribut -> Modul; importiert wird erst beim ersten Zugriff (PEP 562),
+# damit z.B. die Schadensmeldung nicht ChromaDB & Co. mitladen muss
+_LAZY_ATTRS = {
+    "llm_provider": "app.core.llm_provider",
+    "UnifiedLLMProvider": "app.core.llm_provider",
+    "LLMResponse": "app.core.llm_provider",
+    "embedding_provider": "app.core.embeddings",
+    "EmbeddingResult": "app.core.embeddings",
+    "document_processor": "app.core.document_processor",
+    "ProcessedDocument": "app.core.document_processor",
+    "DocumentChunk": "app.core.document_processor",
+    "rag_engine": "app.core.rag_engine",
+    "RAGEngine": "app.core.rag_engine",
+    "KnowledgeBase": "app.core.rag_engine",
+    "SearchResult": "app.core.rag_engine",
+}
 
 __all__ = [
     "llm_provider",
@@ -19,3 +35,28 @@ __all__ = [
     "KnowledgeBase",
     "SearchResult"
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _CoreModule(types.ModuleType):
+    """Submodul-Importe überschreiben gleichnamige Objekte (z.B. rag_engine) nicht"""
+
+    def __setattr__(self, name, value):
+        if name in _LAZY_ATTRS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _CoreModule
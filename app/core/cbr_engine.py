@@ -6,23 +6,50 @@ Mit ML-basiertem Clustering für Kategorisierung
 
 import uuid
 import json
+import atexit
 import re
+import heapq
+import hashlib
+import sqlite3
+import functools
+import threading
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass, asdict
 from pathlib import Path
+from types import MappingProxyType
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import numpy as np
 
 from app.config import CHROMA_DB_DIR, config
 
-# ML für Clustering
+# ML für Clustering: sklearn/scipy erst beim ersten Clustering importieren
+SKLEARN_AVAILABLE = None  # None = noch nicht geprüft
+MiniBatchKMeans = TfidfVectorizer = sparse = None
+
+
+def _load_sklearn() -> bool:
+    """Importiert sklearn/scipy beim ersten Bedarf; True wenn verfügbar"""
+    global SKLEARN_AVAILABLE, MiniBatchKMeans, TfidfVectorizer, sparse
+    if SKLEARN_AVAILABLE is None:
+        try:
+            from sklearn.cluster import MiniBatchKMeans
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from scipy import sparse
+            SKLEARN_AVAILABLE = True
+        except ImportError:
+            SKLEARN_AVAILABLE = False
+    return SKLEARN_AVAILABLE
+
+# Aho-Corasick für die Keyword-Kategorisierung (optional)
 try:
-    from sklearn.cluster import KMeans
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    import numpy as np
-    SKLEARN_AVAILABLE = True
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
 except ImportError:
-    SKLEARN_AVAILABLE = False
+    AHOCORASICK_AVAILABLE = False
 
 
 @dataclass
@@ -56,6 +83,156 @@ PREDEFINED_CATEGORIES = {
 }
 
 
+# Feedback -> Score (einmal angelegt, unveränderlich)
+_FEEDBACK_SCORES = MappingProxyType({
+    "positive": 1.0,
+    "very_positive": 1.0,
+    "neutral": 0.0,
+    "negative": -0.5,
+    "very_negative": -1.0,
+    "corrected": 0.2  # Korrigierte Cases haben niedrigeren Score als positiv
+})
+
+
+# Keyword -> Kategorie und eine kompilierte Alternation aller Keywords
+# (Lookahead, damit wie beim Automaten auch überlappende Treffer gefunden werden)
+_KEYWORD_TO_CATEGORY = {
+    kw: category for category, keywords in PREDEFINED_CATEGORIES.items() for kw in keywords
+}
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEYWORD_TO_CATEGORY, key=len, reverse=True))) + "))"
+)
+
+# Komposita: ein Keyword trifft am Wortanfang ("Lohnabrechnung", "Kündigungsfrist")
+# oder als letzter Wortteil mit Flexionsendung ("Arbeitsvertrag", "Neukunden").
+# Davor muss ein eigener Wortteil stehen, keine blosse Vorsilbe ("Urkunde",
+# "Fortschritt"); mitten im Wort zählt es nicht ("Belohnung").
+_FLEXIONSENDUNGEN = frozenset({"", "e", "en", "n", "s", "es", "er", "ern"})
+_MIN_BESTIMMUNGSWORT = 3
+_VORSILBEN = frozenset({"ver", "ent", "zer", "fort", "miss"})
+
+
+def _keyword_passt(text: str, start: int, ende: int) -> bool:
+    """Prüft, ob das Keyword in text[start:ende] am Wortanfang oder als Kompositum-Ende steht"""
+    wortanfang = start
+    while wortanfang > 0 and text[wortanfang - 1].isalnum():
+        wortanfang -= 1
+    if wortanfang == start:
+        return True
+    wortende = ende
+    while wortende < len(text) and text[wortende].isalnum():
+        wortende += 1
+    if text[ende:wortende] not in _FLEXIONSENDUNGEN:
+        return False
+    bestimmungswort = text[wortanfang:start]
+    return len(bestimmungswort) >= _MIN_BESTIMMUNGSWORT and bestimmungswort not in _VORSILBEN
+
+
+def _build_keyword_automaton():
+    """Aho-Corasick-Automat über alle Keywords: ein Durchlauf pro Frage"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for category, keywords in PREDEFINED_CATEGORIES.items():
+        for kw in keywords:
+            automaton.add_word(kw, (category, kw))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _classify_question(question: str) -> Tuple[str, float]:
+    """Keyword-Klassifikation auf Modulebene (auch in Worker-Prozessen nutzbar)"""
+    question_lower = question.lower()
+
+    # Jedes gefundene Keyword zählt einmal
+    if _KEYWORD_AUTOMATON is not None:
+        gefunden = {
+            kw for ende, (_, kw) in _KEYWORD_AUTOMATON.iter(question_lower)
+            if _keyword_passt(question_lower, ende + 1 - len(kw), ende + 1)
+        }
+    else:
+        gefunden = {
+            m.group(1) for m in _KEYWORD_RE.finditer(question_lower)
+            if _keyword_passt(question_lower, m.start(), m.start() + len(m.group(1)))
+        }
+    treffer = Counter(_KEYWORD_TO_CATEGORY[kw] for kw in gefunden)
+    scores = {category: treffer[category] for category in PREDEFINED_CATEGORIES
+              if treffer[category] > 0}
+
+    if not scores:
+        return ("sonstiges", 0.0)
+
+    best_category = max(scores.items(), key=lambda x: x[1])
+    # Confidence basierend auf Anzahl der Treffer (max 1.0)
+    confidence = min(best_category[1] / 3.0, 1.0)
+
+    return (best_category[0], confidence)
+
+
+class _CaseSpalten:
+    """Kennzahlen aller Cases als NumPy-Spalten (Structure of Arrays) für die Statistiken"""
+
+    def __init__(self, metadaten: Dict[str, Dict[str, Any]]):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        # Kategorie-Namen; die Spalte "kategorie" enthält den Index in diese Liste
+        self.kategorien: List[str] = []
+        self._kategorie_codes: Dict[str, int] = {}
+        kapazitaet = max(16, len(metadaten))
+        self.scores = np.zeros(kapazitaet, dtype=np.float64)
+        self.reuses = np.zeros(kapazitaet, dtype=np.int64)
+        self.corrected = np.zeros(kapazitaet, dtype=bool)
+        self.kategorie = np.zeros(kapazitaet, dtype=np.int32)
+        for doc_id, metadata in metadaten.items():
+            self.setzen(doc_id, metadata)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _spalten(self):
+        return (self.scores, self.reuses, self.corrected, self.kategorie)
+
+    def _kategorie_code(self, name: str) -> int:
+        code = self._kategorie_codes.get(name)
+        if code is None:
+            code = self._kategorie_codes[name] = len(self.kategorien)
+            self.kategorien.append(name)
+        return code
+
+    def setzen(self, doc_id: str, metadata: Dict[str, Any]):
+        """Übernimmt die (vollständigen) Metadaten eines Cases"""
+        i = self.index.get(doc_id)
+        if i is None:
+            i = len(self.ids)
+            if i == len(self.scores):
+                # Kapazität verdoppeln
+                self.scores, self.reuses, self.corrected, self.kategorie = (
+                    np.concatenate([spalte, np.zeros_like(spalte)]) for spalte in self._spalten()
+                )
+            self.ids.append(doc_id)
+            self.index[doc_id] = i
+        self.scores[i] = metadata.get("feedback_score", 0)
+        self.reuses[i] = metadata.get("times_reused", 0)
+        self.corrected[i] = metadata.get("feedback") == "corrected"
+        self.kategorie[i] = self._kategorie_code(metadata.get("cluster_label", "sonstiges"))
+
+    def entfernen(self, doc_id: str):
+        """Entfernt einen Case (letzte Zeile rückt an seine Stelle)"""
+        i = self.index.pop(doc_id, None)
+        if i is None:
+            return
+        letzte = len(self.ids) - 1
+        if i != letzte:
+            for spalte in self._spalten():
+                spalte[i] = spalte[letzte]
+            self.ids[i] = self.ids[letzte]
+            self.index[self.ids[i]] = i
+        self.ids.pop()
+
+
 class CBREngine:
     """Case-Based Reasoning Engine für kontinuierliches Lernen"""
 
@@ -64,6 +241,26 @@ class CBREngine:
         self._client = chroma_client
         self.collection_name = "sp_cbr_cases"
         self.collection = None  # Lazy loading
+        # Gefitteter TF-IDF Vektorisierer: (ids, vectorizer, matrix) des letzten Clusterings
+        self._tfidf_cache = None
+        # Zähler für Änderungen an der Collection; invalidiert den Statistik-Cache
+        self._mutationen = 0
+        self._stats_cache = None  # (mutationen, statistik)
+        # In-Memory-Spiegel der Metadaten: id -> metadata (lazy geladen)
+        self._meta_cache = None
+        # Kennzahlen als NumPy-Spalten (lazy aus dem Spiegel aufgebaut)
+        self._spalten = None
+        # Gesammelte Reuse-Zähler, die noch nicht in ChromaDB geschrieben wurden
+        self._pending_reuse = Counter()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self._flush_atexit = False
+        # Embedding-Funktion der Collection; Frage-Embeddings werden gecacht
+        self._embedding_function = None
+        self._embed_question = functools.lru_cache(maxsize=1024)(self._embed_question_uncached)
+        # Antworttexte liegen inhaltsadressiert neben ChromaDB (Metadaten nur mit Hash)
+        self.antworten_path = CHROMA_DB_DIR / "cbr_antworten.db"
+        self._antworten_init = False
 
     @property
     def client(self):
@@ -80,13 +277,146 @@ class CBREngine:
             return
 
         try:
+            # Explizit die ChromaDB-Standardfunktion (wie bisher implizit), damit
+            # Frage-Embeddings selbst berechnet und gecacht werden können
+            from chromadb.utils import embedding_functions
+            self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
             self.collection = self.client.get_or_create_collection(
                 name=self.collection_name,
-                metadata={"description": "CBR Cases für Feedback-basiertes Lernen"}
+                metadata={
+                    "description": "CBR Cases für Feedback-basiertes Lernen",
+                    # Kleiner HNSW-Graph: wenige tausend Cases, gesucht werden nur top_k*2
+                    # (greift nur beim Anlegen; "hnsw:space" bleibt l2 wegen der Similarity-Formel)
+                    "hnsw:M": 8,
+                    "hnsw:construction_ef": 40,
+                    "hnsw:search_ef": 20
+                },
+                embedding_function=self._embedding_function
             )
         except Exception as e:
             print(f"CBR Collection Fehler: {e}")
             self.collection = None
+            return
+
+        try:
+            self._backfill_kb_flags()
+        except Exception as e:
+            print(f"CBR KB-Felder Fehler: {e}")
+
+    def _embed_question_uncached(self, question: str):
+        """Embedding einer Suchfrage (über _embed_question gecacht)"""
+        return self._embedding_function([question])[0]
+
+    def _antworten_db(self) -> sqlite3.Connection:
+        """Verbindung zur Antwort-Tabelle (hash -> text), beim ersten Mal angelegt"""
+        if not self._antworten_init:
+            self.antworten_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(sqlite3.connect(self.antworten_path)) as conn, conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS antworten (hash TEXT PRIMARY KEY, text TEXT)")
+            self._antworten_init = True
+        return sqlite3.connect(self.antworten_path)
+
+    def _speichere_antwort(self, answer: str) -> str:
+        """Legt die Antwort ab und gibt ihren Hash zurück"""
+        answer_hash = hashlib.blake2b(answer.encode("utf-8"), digest_size=16).hexdigest()
+        with closing(self._antworten_db()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO antworten VALUES (?, ?)", (answer_hash, answer))
+        return answer_hash
+
+    def _mit_antworten(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Ergänzt "answer" bei Cases, die nur einen answer_hash haben (eine Abfrage)"""
+        hashes = {case["answer_hash"] for case in cases if case.get("answer_hash")}
+        if not hashes:
+            return cases
+        try:
+            with closing(self._antworten_db()) as conn:
+                platzhalter = ",".join("?" * len(hashes))
+                antworten = dict(conn.execute(
+                    f"SELECT hash, text FROM antworten WHERE hash IN ({platzhalter})",
+                    list(hashes)
+                ))
+        except sqlite3.Error as e:
+            print(f"CBR Antworten Fehler: {e}")
+            antworten = {}
+        for case in cases:
+            answer_hash = case.pop("answer_hash", None)
+            if answer_hash:
+                case["answer"] = antworten.get(answer_hash, "")
+        return cases
+
+    @staticmethod
+    def _kb_flags(knowledge_bases: List[str]) -> Dict[str, bool]:
+        """Ein Metadaten-Feld pro Wissensbasis (für ChromaDB where-Filter)"""
+        return {f"kb_{kb}": True for kb in knowledge_bases}
+
+    @staticmethod
+    def _knowledge_bases(metadata: Dict[str, Any]) -> List[str]:
+        """Wissensbasen eines Cases aus den kb_-Feldern (ohne JSON)"""
+        if "kb_flags" not in metadata:
+            # Alter Case, noch nicht nachgeführt
+            return json.loads(metadata.get("knowledge_bases", "[]"))
+        return [key[3:] for key, value in metadata.items()
+                if value is True and key.startswith("kb_") and key != "kb_flags"]
+
+    def _metadaten(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Metadaten aller Cases (id -> metadata).
+
+        Wird einmal aus ChromaDB geladen und danach bei jeder Änderung über
+        diese Engine nachgeführt, statt bei jeder Abfrage die ganze
+        Collection zu lesen. Nicht direkt verändern.
+        """
+        if self._meta_cache is None:
+            all_data = self.collection.get(include=["metadatas"])
+            self._meta_cache = dict(zip(all_data["ids"], all_data["metadatas"]))
+        return self._meta_cache
+
+    def _backfill_kb_flags(self):
+        """Ergänzt die kb_-Felder bei Cases, die vor ihrer Einführung gespeichert wurden"""
+        ids, metadatas = [], []
+        for doc_id, metadata in self._metadaten().items():
+            if "kb_flags" in metadata:
+                continue
+            metadata = dict(metadata)
+            metadata.update(self._kb_flags(json.loads(metadata.get("knowledge_bases", "[]"))))
+            metadata["kb_flags"] = True
+            ids.append(doc_id)
+            metadatas.append(metadata)
+        if ids:
+            self._update_metadatas(ids, metadatas)
+
+    def _update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]],
+                          spiegeln: bool = True):
+        """
+        Schreibt Metadaten gebündelt (ein ChromaDB-Update pro Batch statt pro Case).
+        Mit spiegeln=False bleibt der In-Memory-Spiegel unberührt (bereits aktuell).
+        """
+        batch_size = max(1, config.cbr_update_batch)
+        if spiegeln:
+            self._mutationen += 1
+        for start in range(0, len(ids), batch_size):
+            self.collection.update(
+                ids=ids[start:start + batch_size],
+                metadatas=metadatas[start:start + batch_size]
+            )
+            if spiegeln:
+                self._spiegel_aktualisieren(ids[start:start + batch_size],
+                                            metadatas[start:start + batch_size])
+
+    def _spiegel_aktualisieren(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Überträgt geschriebene Metadaten in den In-Memory-Spiegel (wie ChromaDB: zusammenführen)"""
+        if self._meta_cache is None:
+            return
+        for doc_id, metadata in zip(ids, metadatas):
+            self._meta_cache[doc_id] = {**self._meta_cache.get(doc_id, {}), **metadata}
+            if self._spalten is not None:
+                self._spalten.setzen(doc_id, self._meta_cache[doc_id])
+
+    def _kennzahlen(self) -> _CaseSpalten:
+        """Feedback-Score, Reuse-Zähler und Kategorie aller Cases als Spalten"""
+        if self._spalten is None:
+            self._spalten = _CaseSpalten(self._metadaten())
+        return self._spalten
 
     def store_case(
         self,
@@ -105,15 +435,7 @@ class CBREngine:
             return None
 
         # Feedback Score berechnen
-        feedback_scores = {
-            "positive": 1.0,
-            "very_positive": 1.0,
-            "neutral": 0.0,
-            "negative": -0.5,
-            "very_negative": -1.0,
-            "corrected": 0.2  # Korrigierte Cases haben niedrigeren Score als positiv
-        }
-        feedback_score = feedback_scores.get(feedback, 0.0)
+        feedback_score = _FEEDBACK_SCORES.get(feedback, 0.0)
 
         # Automatische Kategorisierung
         category, confidence = self.classify_question(question)
@@ -137,23 +459,32 @@ class CBREngine:
 
         try:
             # In ChromaDB speichern
+            metadata = {
+                "question": question[:1000],  # Limit für Metadata
+                "feedback": feedback,
+                "feedback_score": feedback_score,
+                "model_used": model_used,
+                "user_id": user_id,
+                "created_at": case.created_at,
+                "times_reused": 0,
+                "cluster_label": category.lower(),
+                "cluster_confidence": confidence,
+                "kb_flags": True,
+                **self._kb_flags(knowledge_bases or [])
+            }
+            try:
+                metadata["answer_hash"] = self._speichere_antwort(answer)
+            except sqlite3.Error as e:
+                # Notfalls wie früher direkt in den Metadaten
+                print(f"CBR Antwort speichern Fehler: {e}")
+                metadata["answer"] = answer[:2000]
             self.collection.add(
                 ids=[case.id],
                 documents=[f"{question}\n\n{answer}"],
-                metadatas=[{
-                    "question": question[:1000],  # Limit für Metadata
-                    "answer": answer[:2000],
-                    "feedback": feedback,
-                    "feedback_score": feedback_score,
-                    "knowledge_bases": json.dumps(knowledge_bases or []),
-                    "model_used": model_used,
-                    "user_id": user_id,
-                    "created_at": case.created_at,
-                    "times_reused": 0,
-                    "cluster_label": category,
-                    "cluster_confidence": confidence
-                }]
+                metadatas=[metadata]
             )
+            self._mutationen += 1
+            self._spiegel_aktualisieren([case.id], [metadata])
             return case
         except Exception as e:
             print(f"Case speichern Fehler: {e}")
@@ -171,12 +502,20 @@ class CBREngine:
         if not self.collection:
             return []
 
+        # Feedback- und Knowledge-Base-Filter direkt in ChromaDB
+        bedingungen = [{"feedback_score": {"$gte": min_feedback_score}}]
+        if knowledge_bases:
+            kb_filter = [{f"kb_{kb}": True} for kb in knowledge_bases]
+            bedingungen.append(kb_filter[0] if len(kb_filter) == 1 else {"$or": kb_filter})
+        where = bedingungen[0] if len(bedingungen) == 1 else {"$and": bedingungen}
+
         try:
             # Suche in ChromaDB
             results = self.collection.query(
-                query_texts=[question],
-                n_results=top_k * 2,  # Mehr holen, dann filtern
-                include=["documents", "metadatas", "distances"]
+                query_embeddings=[self._embed_question(question)],
+                n_results=top_k * 2,  # Mehr holen, dann nach Relevanz sortieren
+                where=where,
+                include=["metadatas", "distances"]
             )
 
             if not results["ids"][0]:
@@ -187,32 +526,22 @@ class CBREngine:
                 metadata = results["metadatas"][0][i]
                 distance = results["distances"][0][i] if results["distances"] else 1.0
 
-                # Nur positive Cases
-                if metadata.get("feedback_score", 0) < min_feedback_score:
-                    continue
-
-                # Knowledge Base Filter
-                if knowledge_bases:
-                    case_kbs = json.loads(metadata.get("knowledge_bases", "[]"))
-                    if not any(kb in case_kbs for kb in knowledge_bases):
-                        continue
-
                 similarity = 1.0 - (distance / 2.0)  # Normalisieren
 
                 cases.append({
                     "id": doc_id,
                     "question": metadata.get("question", ""),
                     "answer": metadata.get("answer", ""),
+                    "answer_hash": metadata.get("answer_hash"),
                     "feedback": metadata.get("feedback", ""),
                     "feedback_score": metadata.get("feedback_score", 0),
                     "similarity": similarity,
                     "times_reused": metadata.get("times_reused", 0)
                 })
 
-            # Nach Relevanz sortieren (Kombination aus Similarity und Feedback)
-            cases.sort(key=lambda x: x["similarity"] * (1 + x["feedback_score"]), reverse=True)
-
-            return cases[:top_k]
+            # Beste top_k nach Relevanz (Kombination aus Similarity und Feedback)
+            cases = heapq.nlargest(top_k, cases, key=lambda x: x["similarity"] * (1 + x["feedback_score"]))
+            return self._mit_antworten(cases)
 
         except Exception as e:
             print(f"Case Retrieval Fehler: {e}")
@@ -225,38 +554,72 @@ class CBREngine:
             return
 
         try:
-            result = self.collection.get(ids=[case_id], include=["metadatas"])
-            if result["metadatas"]:
-                metadata = result["metadatas"][0]
-                metadata["times_reused"] = metadata.get("times_reused", 0) + 1
-                self.collection.update(ids=[case_id], metadatas=[metadata])
+            with self._flush_lock:
+                metadata = self._metadaten().get(case_id)
+                if metadata is None:
+                    return
+                # Sofort im Spiegel zählen, in ChromaDB gesammelt schreiben
+                self._spiegel_aktualisieren(
+                    [case_id], [{"times_reused": metadata.get("times_reused", 0) + 1}]
+                )
+                self._mutationen += 1
+                self._pending_reuse[case_id] += 1
+                sofort = len(self._pending_reuse) >= self.REUSE_FLUSH_MAX
+                if not sofort and self._flush_timer is None:
+                    if not self._flush_atexit:
+                        # Offene Zähler beim Beenden des Prozesses noch schreiben
+                        atexit.register(self._flush_reuse)
+                        self._flush_atexit = True
+                    self._flush_timer = threading.Timer(self.REUSE_FLUSH_SEKUNDEN, self._flush_reuse)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+            if sofort:
+                self._flush_reuse()
         except Exception:
             pass
 
+    # Reuse-Zähler werden spätestens nach so vielen Sekunden bzw. Cases geschrieben
+    REUSE_FLUSH_SEKUNDEN = 2.0
+    REUSE_FLUSH_MAX = 50
+
+    def _flush_reuse(self):
+        """
+        Schreibt die gesammelten Reuse-Zähler mit einem Update nach ChromaDB.
+        Läuft auch im Timer-Thread: liest den Spiegel nur unter _flush_lock und
+        verändert ihn nicht (increment_reuse_count hat ihn schon nachgeführt).
+        """
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            ids = [case_id for case_id in self._pending_reuse if case_id in self._meta_cache]
+            self._pending_reuse.clear()
+            if not ids:
+                return
+            metadatas = [{"times_reused": self._meta_cache[case_id].get("times_reused", 0)}
+                         for case_id in ids]
+            try:
+                self._update_metadatas(ids, metadatas, spiegeln=False)
+            except Exception as e:
+                print(f"Reuse-Zähler Fehler: {e}")
+
     def update_feedback(self, case_id: str, new_feedback: str, comment: str = None):
         """Aktualisiert das Feedback eines Cases"""
         self._ensure_collection()
         if not self.collection:
             return False
 
-        feedback_scores = {
-            "positive": 1.0,
-            "very_positive": 1.0,
-            "neutral": 0.0,
-            "negative": -0.5,
-            "very_negative": -1.0,
-            "corrected": 0.2
-        }
-
         try:
-            result = self.collection.get(ids=[case_id], include=["metadatas"])
-            if result["metadatas"]:
-                metadata = result["metadatas"][0]
+            metadata = self._metadaten().get(case_id)
+            if metadata is not None:
+                metadata = dict(metadata)
                 metadata["feedback"] = new_feedback
-                metadata["feedback_score"] = feedback_scores.get(new_feedback, 0.0)
+                metadata["feedback_score"] = _FEEDBACK_SCORES.get(new_feedback, 0.0)
                 if comment:
                     metadata["feedback_comment"] = comment[:500]
                 self.collection.update(ids=[case_id], metadatas=[metadata])
+                self._mutationen += 1
+                self._spiegel_aktualisieren([case_id], [metadata])
                 return True
         except Exception as e:
             print(f"Feedback Update Fehler: {e}")
@@ -268,12 +631,18 @@ class CBREngine:
         if not self.collection:
             return {}
 
+        # Seit der letzten Berechnung unverändert -> Cache verwenden
+        if self._stats_cache is not None and self._stats_cache[0] == self._mutationen:
+            return dict(self._stats_cache[1])
+
         try:
-            count = self.collection.count()
+            mutationen = self._mutationen
+            spalten = self._kennzahlen()
+            count = len(spalten)
 
             # Alle Cases holen für Statistiken
             if count == 0:
-                return {
+                stats = {
                     "total_cases": 0,
                     "positive_cases": 0,
                     "negative_cases": 0,
@@ -281,36 +650,35 @@ class CBREngine:
                     "avg_feedback_score": 0,
                     "total_reuses": 0
                 }
+                self._stats_cache = (mutationen, stats)
+                return dict(stats)
 
-            all_data = self.collection.get(include=["metadatas"])
-            metadatas = all_data["metadatas"]
-
-            positive = sum(1 for m in metadatas if m.get("feedback_score", 0) > 0)
-            negative = sum(1 for m in metadatas if m.get("feedback_score", 0) < 0)
-            corrected = sum(1 for m in metadatas if m.get("feedback") == "corrected")
-            neutral = count - positive - negative
-
-            total_score = sum(m.get("feedback_score", 0) for m in metadatas)
-            avg_score = total_score / count if count > 0 else 0
-
-            total_reuses = sum(m.get("times_reused", 0) for m in metadatas)
+            # Vektorisierte Kennzahlen über die Spalten
+            scores = spalten.scores[:count]
+            reuses = spalten.reuses[:count]
+            positive = int(np.count_nonzero(scores > 0))
+            negative = int(np.count_nonzero(scores < 0))
 
             # Top wiederverwendete Cases
-            reuse_data = [(m.get("question", "")[:50], m.get("times_reused", 0))
-                         for m in metadatas if m.get("times_reused", 0) > 0]
-            reuse_data.sort(key=lambda x: x[1], reverse=True)
+            metadaten = self._metadaten()
+            kandidaten = np.flatnonzero(reuses > 0)
+            top = kandidaten[np.argsort(-reuses[kandidaten], kind="stable")[:5]]
+            reuse_data = [(metadaten[spalten.ids[i]].get("question", "")[:50], int(reuses[i]))
+                          for i in top]
 
-            return {
+            stats = {
                 "total_cases": count,
                 "positive_cases": positive,
                 "negative_cases": negative,
-                "corrected_cases": corrected,
-                "neutral_cases": neutral,
-                "positive_rate": positive / count if count > 0 else 0,
-                "avg_feedback_score": avg_score,
-                "total_reuses": total_reuses,
-                "top_reused": reuse_data[:5]
+                "corrected_cases": int(np.count_nonzero(spalten.corrected[:count])),
+                "neutral_cases": count - positive - negative,
+                "positive_rate": positive / count,
+                "avg_feedback_score": float(scores.mean()),
+                "total_reuses": int(reuses.sum()),
+                "top_reused": reuse_data
             }
+            self._stats_cache = (mutationen, stats)
+            return dict(stats)
 
         except Exception as e:
             print(f"Statistik Fehler: {e}")
@@ -323,22 +691,11 @@ class CBREngine:
             return []
 
         try:
-            result = self.collection.get(
-                include=["metadatas"],
-                limit=limit
-            )
+            cases = [{"id": doc_id, **metadata, "knowledge_bases": self._knowledge_bases(metadata)}
+                     for doc_id, metadata in self._metadaten().items()]
 
-            cases = []
-            for i, doc_id in enumerate(result["ids"]):
-                metadata = result["metadatas"][i]
-                cases.append({
-                    "id": doc_id,
-                    **metadata
-                })
-
-            # Nach Datum sortieren
-            cases.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-            return cases
+            # Die neuesten Cases nach Datum
+            return self._mit_antworten(heapq.nlargest(limit, cases, key=lambda x: x.get("created_at", "")))
 
         except Exception:
             return []
@@ -351,6 +708,11 @@ class CBREngine:
 
         try:
             self.collection.delete(ids=[case_id])
+            self._mutationen += 1
+            if self._meta_cache is not None:
+                self._meta_cache.pop(case_id, None)
+            if self._spalten is not None:
+                self._spalten.entfernen(case_id)
             return True
         except Exception:
             return False
@@ -383,22 +745,10 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
         Returns:
             Tuple[category_name, confidence_score]
         """
-        question_lower = question.lower()
-        scores = {}
-
-        for category, keywords in PREDEFINED_CATEGORIES.items():
-            score = sum(1 for kw in keywords if kw in question_lower)
-            if score > 0:
-                scores[category] = score
+        return _classify_question(question)
 
-        if not scores:
-            return ("sonstiges", 0.0)
-
-        best_category = max(scores.items(), key=lambda x: x[1])
-        # Confidence basierend auf Anzahl der Treffer (max 1.0)
-        confidence = min(best_category[1] / 3.0, 1.0)
-
-        return (best_category[0], confidence)
+    # Ab so vielen Cases lohnt sich ein Prozess-Pool (darunter überwiegt der Start-Overhead)
+    PARALLEL_CLASSIFY_MIN = 50000
 
     def auto_classify_cases(self) -> Dict[str, int]:
         """
@@ -413,25 +763,34 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
             return {}
 
         try:
-            all_data = self.collection.get(include=["metadatas"])
-            if not all_data["ids"]:
+            metadaten = self._metadaten()
+            if not metadaten:
                 return {}
 
+            ids = list(metadaten)
+            metadatas = [dict(m) for m in metadaten.values()]
+            questions = [m.get("question", "") for m in metadatas]
             category_counts = Counter()
 
-            for i, doc_id in enumerate(all_data["ids"]):
-                metadata = all_data["metadatas"][i]
-                question = metadata.get("question", "")
-
-                # Klassifiziere
-                category, confidence = self.classify_question(question)
+            # Klassifiziere (bei sehr vielen Cases parallel in Worker-Prozessen)
+            ergebnisse = None
+            if len(questions) >= self.PARALLEL_CLASSIFY_MIN:
+                try:
+                    with ProcessPoolExecutor() as executor:
+                        ergebnisse = list(executor.map(_classify_question, questions, chunksize=256))
+                except Exception as e:
+                    print(f"Paralleles Klassifizieren Fehler: {e}")
+            if ergebnisse is None:
+                ergebnisse = [_classify_question(q) for q in questions]
+
+            for metadata, (category, confidence) in zip(metadatas, ergebnisse):
                 category_counts[category] += 1
 
                 # Update metadata mit Cluster-Info
-                metadata["cluster_label"] = category
+                metadata["cluster_label"] = category.lower()
                 metadata["cluster_confidence"] = confidence
 
-                self.collection.update(ids=[doc_id], metadatas=[metadata])
+            self._update_metadatas(ids, metadatas)
 
             return dict(category_counts)
 
@@ -450,7 +809,7 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
         Returns:
             Dict mit Cluster-Informationen
         """
-        if not SKLEARN_AVAILABLE:
+        if not _load_sklearn():
             return {"error": "sklearn nicht installiert"}
 
         self._ensure_collection()
@@ -458,24 +817,26 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
             return {"error": "Keine Collection"}
 
         try:
-            all_data = self.collection.get(include=["metadatas"])
-            if not all_data["ids"] or len(all_data["ids"]) < n_clusters:
+            metadaten = self._metadaten()
+            if not metadaten or len(metadaten) < n_clusters:
                 return {"error": "Nicht genug Daten für Clustering"}
 
             # Fragen extrahieren
-            questions = [m.get("question", "") for m in all_data["metadatas"]]
-            doc_ids = all_data["ids"]
-
-            # TF-IDF Vektorisierung
-            vectorizer = TfidfVectorizer(
-                max_features=500,
-                stop_words=None,  # Deutsch hat andere Stop-Words
-                ngram_range=(1, 2)
+            doc_ids = list(metadaten)
+            metadatas = [dict(m) for m in metadaten.values()]
+            questions = [m.get("question", "") for m in metadatas]
+
+            # TF-IDF Vektorisierung (inkrementell, falls möglich)
+            vectorizer, tfidf_matrix = self._tfidf_for(doc_ids, questions)
+
+            # K-Means Clustering (Mini-Batch: wenige Durchläufe statt 10x Lloyd über alle Cases)
+            kmeans = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=1024,
+                n_init=3,
+                reassignment_ratio=0.01,
+                random_state=42
             )
-            tfidf_matrix = vectorizer.fit_transform(questions)
-
-            # K-Means Clustering
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
             clusters = kmeans.fit_predict(tfidf_matrix)
 
             # Cluster-Labels generieren (häufigste Wörter pro Cluster)
@@ -502,11 +863,11 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
                 cluster_label = cluster_labels[cluster_id]
                 cluster_counts[cluster_label] += 1
 
-                metadata = all_data["metadatas"][i]
+                metadata = metadatas[i]
                 metadata["kmeans_cluster"] = cluster_id
                 metadata["kmeans_label"] = cluster_label
 
-                self.collection.update(ids=[doc_id], metadatas=[metadata])
+            self._update_metadatas(doc_ids, metadatas)
 
             return {
                 "n_clusters": n_clusters,
@@ -519,6 +880,50 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
             print(f"K-Means Fehler: {e}")
             return {"error": str(e)}
 
+    # Anteil neuer Cases, ab dem der TF-IDF Vektorisierer neu gefittet wird
+    TFIDF_REFIT_RATIO = 0.2
+
+    def _tfidf_for(self, doc_ids: List[str], questions: List[str]):
+        """
+        TF-IDF Matrix für die Fragen, Zeilen in der Reihenfolge von doc_ids.
+
+        Bei unveränderten Cases wird die letzte Matrix wiederverwendet. Kamen seit
+        dem letzten Fit nur wenige Cases dazu (höchstens TFIDF_REFIT_RATIO der
+        damaligen Anzahl), werden die neuen mit dem bestehenden Vokabular
+        transformiert; sonst wird neu gefittet.
+        """
+        _load_sklearn()
+        if self._tfidf_cache is not None:
+            cached_ids, vectorizer, matrix, fit_count = self._tfidf_cache
+            if cached_ids == doc_ids:
+                return vectorizer, matrix
+
+            row_of = {doc_id: row for row, doc_id in enumerate(cached_ids)}
+            if len(row_of) == len(cached_ids) and row_of.keys() <= set(doc_ids):
+                new_rows = [i for i, doc_id in enumerate(doc_ids) if doc_id not in row_of]
+                # Seit dem letzten Fit hinzugekommene Cases (frühere Schritte + jetzt)
+                seit_fit = len(cached_ids) - fit_count + len(new_rows)
+                if seit_fit <= self.TFIDF_REFIT_RATIO * fit_count:
+                    new_matrix = vectorizer.transform([questions[i] for i in new_rows])
+                    stacked = sparse.vstack([matrix, new_matrix]).tocsr()
+                    # Zeilen in die aktuelle Reihenfolge bringen
+                    new_row_of = {doc_ids[i]: len(cached_ids) + n for n, i in enumerate(new_rows)}
+                    order = [row_of[d] if d in row_of else new_row_of[d] for d in doc_ids]
+                    matrix = stacked[order]
+                    self._tfidf_cache = (list(doc_ids), vectorizer, matrix, fit_count)
+                    return vectorizer, matrix
+
+        vectorizer = TfidfVectorizer(
+            max_features=500,
+            stop_words=None,  # Deutsch hat andere Stop-Words
+            ngram_range=(1, 2),
+            sublinear_tf=True,
+            dtype=np.float32
+        )
+        matrix = vectorizer.fit_transform(questions)
+        self._tfidf_cache = (list(doc_ids), vectorizer, matrix, len(doc_ids))
+        return vectorizer, matrix
+
     def get_cases_by_category(self, category: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Holt alle Cases einer bestimmten Kategorie"""
         self._ensure_collection()
@@ -526,21 +931,28 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
             return []
 
         try:
-            result = self.collection.get(include=["metadatas"], limit=500)
+            spalten = self._kennzahlen()
+            codes = [code for code, name in enumerate(spalten.kategorien)
+                     if name.lower() == category.lower()]
+            # Unbekannte Kategorie: nichts zu durchsuchen
+            if not codes:
+                return []
 
+            # Zeilen der Kategorie vektorisiert auswählen
+            zeilen = np.flatnonzero(np.isin(spalten.kategorie[:len(spalten)], codes))
+            metadaten = self._metadaten()
             cases = []
-            for i, doc_id in enumerate(result["ids"]):
-                metadata = result["metadatas"][i]
-                case_category = metadata.get("cluster_label", "sonstiges")
-
-                if case_category.lower() == category.lower():
-                    cases.append({
-                        "id": doc_id,
-                        **metadata
-                    })
+            for i in zeilen:
+                doc_id = spalten.ids[i]
+                metadata = metadaten[doc_id]
+                cases.append({
+                    "id": doc_id,
+                    **metadata,
+                    "knowledge_bases": self._knowledge_bases(metadata)
+                })
 
-            cases.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-            return cases[:limit]
+            cases = heapq.nlargest(limit, cases, key=lambda x: x.get("created_at", ""))
+            return self._mit_antworten(cases)
 
         except Exception:
             return []
@@ -552,40 +964,30 @@ Erfolgreiche Antwort: {case['answer'][:500]}...
             return {}
 
         try:
-            all_data = self.collection.get(include=["metadatas"])
-            if not all_data["metadatas"]:
+            spalten = self._kennzahlen()
+            count = len(spalten)
+            if count == 0:
                 return {}
 
-            category_stats = {}
-
-            for metadata in all_data["metadatas"]:
-                category = metadata.get("cluster_label", "sonstiges")
-                feedback_score = metadata.get("feedback_score", 0)
-
-                if category not in category_stats:
-                    category_stats[category] = {
-                        "total": 0,
-                        "positive": 0,
-                        "negative": 0,
-                        "avg_score": 0,
-                        "scores": []
-                    }
-
-                category_stats[category]["total"] += 1
-                category_stats[category]["scores"].append(feedback_score)
+            # Summen pro Kategorie-Code
+            codes = spalten.kategorie[:count]
+            scores = spalten.scores[:count]
+            n = len(spalten.kategorien)
+            totals = np.bincount(codes, minlength=n)
+            positives = np.bincount(codes[scores > 0], minlength=n)
+            negatives = np.bincount(codes[scores < 0], minlength=n)
+            score_sums = np.bincount(codes, weights=scores, minlength=n)
 
-                if feedback_score > 0:
-                    category_stats[category]["positive"] += 1
-                elif feedback_score < 0:
-                    category_stats[category]["negative"] += 1
-
-            # Durchschnitt berechnen
-            for cat, stats in category_stats.items():
-                if stats["scores"]:
-                    stats["avg_score"] = sum(stats["scores"]) / len(stats["scores"])
-                del stats["scores"]  # Nicht in Ausgabe
-
-            return category_stats
+            return {
+                category: {
+                    "total": int(totals[code]),
+                    "positive": int(positives[code]),
+                    "negative": int(negatives[code]),
+                    "avg_score": float(score_sums[code] / totals[code])
+                }
+                for code, category in enumerate(spalten.kategorien)
+                if totals[code] > 0
+            }
 
         except Exception as e:
             print(f"Category Stats Fehler: {e}")
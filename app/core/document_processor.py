@@ -4,72 +4,128 @@ Unterstützt PDF, DOCX, TXT, MD, RTF, XLSX, CSV, MSG, EML, Bilder
 """
 
 import io
+import os
 import re
 import csv
 import email
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
+from types import MappingProxyType
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Document processing libraries
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
+import numpy as np
 
-try:
+# Extraktor-Bibliotheken werden erst beim ersten Dokument des jeweiligen
+# Formats importiert (PyMuPDF & Co. kosten sonst jeden Prozess Startzeit und RAM)
+fitz = DocxDocument = openpyxl = CalamineWorkbook = LexborHTMLParser = BeautifulSoup = extract_msg = pytesseract = Image = None
+
+
+def _import_pymupdf():
+    global fitz
+    import fitz
+
+
+def _import_docx():
+    global DocxDocument
     from docx import Document as DocxDocument
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
 
-try:
+
+def _import_openpyxl():
+    global openpyxl
     import openpyxl
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
 
-try:
+def _import_calamine():
+    global CalamineWorkbook
+    from python_calamine import CalamineWorkbook
+
+
+def _import_selectolax():
+    global LexborHTMLParser
+    from selectolax.lexbor import LexborHTMLParser
+
+
+def _import_bs4():
+    global BeautifulSoup
     from bs4 import BeautifulSoup
-    BS4_AVAILABLE = True
-except ImportError:
-    BS4_AVAILABLE = False
 
-try:
+
+def _import_extract_msg():
+    global extract_msg
     import extract_msg
-    EXTRACT_MSG_AVAILABLE = True
-except ImportError:
-    EXTRACT_MSG_AVAILABLE = False
 
-try:
+
+def _import_ocr():
+    global pytesseract, Image
     import pytesseract
     from PIL import Image
-    OCR_AVAILABLE = True
+
+
+_LAZY_IMPORTS = {
+    "pymupdf": _import_pymupdf,
+    "docx": _import_docx,
+    "openpyxl": _import_openpyxl,
+    "calamine": _import_calamine,
+    "selectolax": _import_selectolax,
+    "bs4": _import_bs4,
+    "extract_msg": _import_extract_msg,
+    "ocr": _import_ocr,
+}
+_LIB_AVAILABLE: Dict[str, bool] = {}
+
+# PyMuPDF ist nicht threadsicher: alle fitz-Zugriffe laufen unter diesem Lock
+_FITZ_LOCK = threading.Lock()
+
+
+def _load(lib: str) -> bool:
+    """Importiert eine Extraktor-Bibliothek beim ersten Bedarf; True wenn verfügbar"""
+    available = _LIB_AVAILABLE.get(lib)
+    if available is None:
+        try:
+            _LAZY_IMPORTS[lib]()
+            available = True
+        except ImportError:
+            available = False
+        _LIB_AVAILABLE[lib] = available
+    return available
+
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
 except ImportError:
-    OCR_AVAILABLE = False
+    XXHASH_AVAILABLE = False
 
 from app.config import config, SUPPORTED_FORMATS
 
+# RTF-Steuerwörter und Klammern
+_RTF_CMD_RE = re.compile(r'\\[a-z]+\d*\s?')
+_RTF_BRACE_RE = re.compile(r'[{}]')
+
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     """Ein Chunk eines Dokuments"""
     id: str
     content: str
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    embedding: Optional[List[float]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)  # nur chunk-spezifische Felder
+    embedding: Optional[np.ndarray] = None  # float32
+    # Dokument-Metadaten, von allen Chunks eines Dokuments geteilt (nicht kopiert)
+    base_metadata: Optional[Dict[str, Any]] = None
+
+    @property
+    def full_metadata(self) -> Dict[str, Any]:
+        """Dokument- und Chunk-Metadaten zusammengeführt (z.B. für ChromaDB)"""
+        if not self.base_metadata:
+            return self.metadata
+        return {**self.base_metadata, **self.metadata}
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedDocument:
     """Verarbeitetes Dokument"""
     id: str
@@ -95,6 +151,37 @@ class DocumentProcessor:
     def __init__(self):
         self.chunk_size = config.rag.chunk_size
         self.chunk_overlap = config.rag.chunk_overlap
+        # Chunk-Geometrie in Zeichen (ca. 4 Zeichen pro Token für Deutsch), einmal berechnet
+        chars_per_token = 4
+        self._chunk_chars = self.chunk_size * chars_per_token
+        self._overlap_chars = self.chunk_overlap * chars_per_token
+        # Gleitendes Fenster: Chunk k beginnt bei k * step; das Ende wird um
+        # höchstens snap Zeichen auf ein Leerzeichen zurückgezogen
+        self._step = max(self._chunk_chars - self._overlap_chars, 1)
+        self._snap = self._overlap_chars // 2
+        # Extraktor je Dateiendung, einmal gebaut statt bei jedem Dokument
+        self._extractors = MappingProxyType({
+            ".pdf": self._extract_pdf,
+            ".docx": self._extract_docx,
+            ".txt": self._extract_txt,
+            ".md": self._extract_txt,
+            ".rtf": self._extract_rtf,
+            ".xlsx": self._extract_xlsx,
+            ".csv": self._extract_csv,
+            ".msg": self._extract_msg,
+            ".eml": self._extract_eml,
+            ".html": self._extract_html,
+            ".htm": self._extract_html,
+            ".png": self._extract_image,
+            ".jpg": self._extract_image,
+            ".jpeg": self._extract_image,
+            ".tiff": self._extract_image
+        })
+        # Formate mit PyMuPDF bzw. OCR: im Batch nacheinander statt parallel
+        self._ocr_formate = frozenset(
+            ext for ext, extractor in self._extractors.items()
+            if extractor in (self._extract_pdf, self._extract_image)
+        )
     
     def process_file(
         self,
@@ -110,20 +197,23 @@ class DocumentProcessor:
         
         extension = file_path.suffix.lower()
         
+        # Datei einmal lesen (für Text und Hash)
+        content = file_path.read_bytes()
+
         # Text extrahieren
-        raw_text = self._extract_text(file_path, extension)
+        raw_text = self._extract_text_from_bytes(content, extension)
         
         # Dokument-ID generieren
         doc_id = self._generate_doc_id(file_path, raw_text)
         
-        # Content-Hash für Change-Detection (SHA256)
-        content_hash = hashlib.sha256(raw_text.encode()).hexdigest()
+        # Content-Hash für Change-Detection (SHA256 über die Originaldatei)
+        content_hash = hashlib.sha256(content).hexdigest()
 
         # Metadata
         metadata = {
             "filename": file_path.name,
             "file_type": extension,
-            "file_size": file_path.stat().st_size,
+            "file_size": len(content),
             "knowledge_base": knowledge_base_id,
             "uploader": uploader_id,
             "upload_date": datetime.now().isoformat(),
@@ -158,8 +248,8 @@ class DocumentProcessor:
         # Dokument-ID generieren
         doc_id = self._generate_doc_id_from_bytes(content, filename)
         
-        # Content-Hash für Change-Detection (SHA256)
-        content_hash = hashlib.sha256(raw_text.encode()).hexdigest()
+        # Content-Hash für Change-Detection (SHA256 über die Originaldatei)
+        content_hash = hashlib.sha256(content).hexdigest()
 
         # Metadata
         metadata = {
@@ -184,6 +274,40 @@ class DocumentProcessor:
             raw_text=raw_text
         )
     
+    def process_bytes_batch(
+        self,
+        items: List[Tuple[bytes, str]],
+        knowledge_base_id: str,
+        uploader_id: str = "system"
+    ) -> Iterator[Tuple[Optional[ProcessedDocument], Optional[Exception]]]:
+        """
+        Verarbeitet mehrere Uploads (content, filename) parallel.
+
+        Extraktion und SHA-256 laufen in Threads (hashlib und die Parser geben
+        den GIL frei). PDFs und Bilder werden nacheinander im aufrufenden Thread
+        verarbeitet: PyMuPDF ist nicht threadsicher und die OCR nutzt bereits
+        ocr_parallel_workers Prozesse. Liefert (Dokument, None) bzw. (None, Fehler)
+        in der Reihenfolge von items, sobald das jeweilige Dokument fertig ist.
+        """
+        def verarbeiten(item: Tuple[bytes, str]):
+            content, filename = item
+            try:
+                return self.process_bytes(content, filename, knowledge_base_id, uploader_id), None
+            except Exception as e:
+                return None, e
+
+        if not items:
+            return
+        workers = min(len(items), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                None if Path(filename).suffix.lower() in self._ocr_formate
+                else executor.submit(verarbeiten, (content, filename))
+                for content, filename in items
+            ]
+            for item, future in zip(items, futures):
+                yield future.result() if future else verarbeiten(item)
+    
     def _extract_text(self, file_path: Path, extension: str) -> str:
         """Extrahiert Text aus einer Datei"""
         with open(file_path, "rb") as f:
@@ -192,64 +316,78 @@ class DocumentProcessor:
     
     def _extract_text_from_bytes(self, content: bytes, extension: str) -> str:
         """Extrahiert Text aus Bytes"""
-        extractors = {
-            ".pdf": self._extract_pdf,
-            ".docx": self._extract_docx,
-            ".txt": self._extract_txt,
-            ".md": self._extract_txt,
-            ".rtf": self._extract_rtf,
-            ".xlsx": self._extract_xlsx,
-            ".csv": self._extract_csv,
-            ".msg": self._extract_msg,
-            ".eml": self._extract_eml,
-            ".html": self._extract_html,
-            ".htm": self._extract_html,
-            ".png": self._extract_image,
-            ".jpg": self._extract_image,
-            ".jpeg": self._extract_image,
-            ".tiff": self._extract_image
-        }
-        
-        extractor = extractors.get(extension)
-        if extractor:
-            return extractor(content)
-        else:
+        extractor = self._extractors.get(extension)
+        if extractor is None:
             raise ValueError(f"Nicht unterstütztes Format: {extension}")
+        return extractor(content)
     
     def _extract_pdf(self, content: bytes) -> str:
         """Extrahiert Text aus PDF (mit OCR-Fallback für Bild-PDFs)"""
-        if not PYMUPDF_AVAILABLE:
+        if not _load("pymupdf"):
             raise ImportError("PyMuPDF nicht installiert. Bitte 'pip install pymupdf' ausführen.")
 
-        doc = fitz.open(stream=content, filetype="pdf")
-        text_parts = []
+        text_parts = {}
+        ocr_page_nums = []
 
-        for page_num, page in enumerate(doc, 1):
-            text = page.get_text()
-            if text.strip():
-                text_parts.append(f"[Seite {page_num}]\n{text}")
-            elif OCR_AVAILABLE:
-                # Fallback: OCR für Bild-PDFs
-                try:
-                    # Seite als Bild rendern (300 DPI)
-                    mat = fitz.Matrix(300/72, 300/72)
-                    pix = page.get_pixmap(matrix=mat)
-                    img_data = pix.tobytes("png")
-
-                    # OCR durchführen
-                    image = Image.open(io.BytesIO(img_data))
-                    ocr_text = pytesseract.image_to_string(image, lang="deu+eng")
-                    if ocr_text.strip():
-                        text_parts.append(f"[Seite {page_num} (OCR)]\n{ocr_text}")
-                except Exception as e:
-                    print(f"OCR-Fehler auf Seite {page_num}: {e}")
-
-        doc.close()
-        return "\n\n".join(text_parts)
+        with _FITZ_LOCK:
+            doc = fitz.open(stream=content, filetype="pdf")
+            for page_num, page in enumerate(doc, 1):
+                text = page.get_text()
+                if text.strip():
+                    text_parts[page_num] = f"[Seite {page_num}]\n{text}"
+                else:
+                    ocr_page_nums.append(page_num)
+
+        # Fallback: OCR für Bild-PDFs, parallel (pytesseract startet je Aufruf
+        # einen eigenen Tesseract-Prozess). Gerendert wird im Hauptthread, immer
+        # nur so viele Seiten wie Worker, damit die Rohbilder nicht den RAM füllen.
+        if ocr_page_nums and _load("ocr"):
+            dpi = 200 if config.rag.fast_ocr else 300
+            workers = max(1, min(config.rag.ocr_parallel_workers, len(ocr_page_nums)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for i in range(0, len(ocr_page_nums), workers):
+                    with _FITZ_LOCK:
+                        batch = [
+                            (page_num, self._render_page(doc[page_num - 1], page_num, dpi))
+                            for page_num in ocr_page_nums[i:i + workers]
+                        ]
+                    for (page_num, _), ocr_text in zip(batch, executor.map(self._ocr_page, batch)):
+                        if ocr_text and ocr_text.strip():
+                            text_parts[page_num] = f"[Seite {page_num} (OCR)]\n{ocr_text}"
+
+        with _FITZ_LOCK:
+            doc.close()
+        return "\n\n".join(text_parts[page_num] for page_num in sorted(text_parts))
+
+    @staticmethod
+    def _render_page(page, page_num: int, dpi: int):
+        """Rendert eine PDF-Seite als PIL-Bild; None bei Fehler"""
+        try:
+            mat = fitz.Matrix(dpi/72, dpi/72)
+            pix = page.get_pixmap(matrix=mat, alpha=False)
+            # Rohe RGB-Pixel direkt an PIL übergeben (kein PNG-Encode/-Decode)
+            return Image.frombuffer(
+                "RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", pix.stride, 1
+            )
+        except Exception as e:
+            print(f"OCR-Fehler auf Seite {page_num}: {e}")
+            return None
+
+    @staticmethod
+    def _ocr_page(page: tuple) -> Optional[str]:
+        """OCR für eine gerenderte PDF-Seite (page_num, PIL-Bild)"""
+        page_num, image = page
+        if image is None:
+            return None
+        try:
+            return pytesseract.image_to_string(image, lang="deu+eng")
+        except Exception as e:
+            print(f"OCR-Fehler auf Seite {page_num}: {e}")
+            return None
     
     def _extract_docx(self, content: bytes) -> str:
         """Extrahiert Text aus DOCX"""
-        if not DOCX_AVAILABLE:
+        if not _load("docx"):
             raise ImportError("python-docx nicht installiert. Bitte 'pip install python-docx' ausführen.")
         
         doc = DocxDocument(io.BytesIO(content))
@@ -270,13 +408,15 @@ class DocumentProcessor:
         """Extrahiert Text aus RTF (Basic)"""
         text = content.decode("utf-8", errors="replace")
         # Einfache RTF-Tag-Entfernung
-        text = re.sub(r'\\[a-z]+\d*\s?', '', text)
-        text = re.sub(r'[{}]', '', text)
+        text = _RTF_CMD_RE.sub('', text)
+        text = _RTF_BRACE_RE.sub('', text)
         return text.strip()
     
     def _extract_xlsx(self, content: bytes) -> str:
-        """Extrahiert Text aus XLSX"""
-        if not OPENPYXL_AVAILABLE:
+        """Extrahiert Text aus XLSX (calamine falls installiert, sonst openpyxl)"""
+        if _load("calamine"):
+            return self._extract_xlsx_calamine(content)
+        if not _load("openpyxl"):
             raise ImportError("openpyxl nicht installiert. Bitte 'pip install openpyxl' ausführen.")
         
         wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True)
@@ -296,17 +436,44 @@ class DocumentProcessor:
         
         wb.close()
         return "\n\n".join(text_parts)
+
+    def _extract_xlsx_calamine(self, content: bytes) -> str:
+        """XLSX via python-calamine (Rust-Parser, liefert Zeilen direkt als Listen)"""
+        wb = CalamineWorkbook.from_filelike(io.BytesIO(content))
+        text_parts = []
+
+        for sheet_name in wb.sheet_names:
+            text_parts.append(f"[Tabellenblatt: {sheet_name}]")
+
+            rows = []
+            for row in wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False):
+                row_text = " | ".join(map(self._xlsx_cell, row))
+                if row_text.strip():
+                    rows.append(row_text)
+
+            text_parts.append("\n".join(rows))
+
+        wb.close()
+        return "\n\n".join(text_parts)
+
+    @staticmethod
+    def _xlsx_cell(value: Any) -> str:
+        """Zellwert als Text wie bei openpyxl (calamine liefert Zahlen immer als float)"""
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
     
     def _extract_csv(self, content: bytes) -> str:
         """Extrahiert Text aus CSV"""
         text = content.decode("utf-8", errors="replace")
         reader = csv.reader(io.StringIO(text))
-        rows = [" | ".join(row) for row in reader]
-        return "\n".join(rows)
+        return "\n".join(map(" | ".join, reader))
     
     def _extract_msg(self, content: bytes) -> str:
         """Extrahiert Text aus MSG (Outlook)"""
-        if not EXTRACT_MSG_AVAILABLE:
+        if not _load("extract_msg"):
             raise ImportError("extract-msg nicht installiert. Bitte 'pip install extract-msg' ausführen.")
         
         msg = extract_msg.Message(io.BytesIO(content))
@@ -347,8 +514,14 @@ class DocumentProcessor:
         return "\n".join(parts)
     
     def _extract_html(self, content: bytes) -> str:
-        """Extrahiert Text aus HTML"""
-        if not BS4_AVAILABLE:
+        """Extrahiert Text aus HTML (selectolax falls installiert, sonst BeautifulSoup)"""
+        if _load("selectolax"):
+            tree = LexborHTMLParser(content)
+            tree.strip_tags(["script", "style"])
+            text = tree.root.text(separator="\n", strip=True) if tree.root else ""
+            # Leere Textknoten wie bei BeautifulSoup auslassen
+            return "\n".join(line for line in text.split("\n") if line)
+        if not _load("bs4"):
             raise ImportError("BeautifulSoup nicht installiert. Bitte 'pip install beautifulsoup4' ausführen.")
         
         soup = BeautifulSoup(content, "html.parser")
@@ -361,7 +534,7 @@ class DocumentProcessor:
     
     def _extract_image(self, content: bytes) -> str:
         """Extrahiert Text aus Bildern via OCR"""
-        if not OCR_AVAILABLE:
+        if not _load("ocr"):
             raise ImportError(
                 "OCR nicht verfügbar. Bitte 'pip install pytesseract pillow' "
                 "und Tesseract installieren."
@@ -381,70 +554,74 @@ class DocumentProcessor:
         if not text.strip():
             return []
         
-        # Normalisiere Whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        # Normalisiere Whitespace (str.split() trennt an denselben Zeichen wie \s, ohne Regex)
+        text = " ".join(text.split())
         
-        # Schätze Token-Länge (ca. 4 Zeichen pro Token für Deutsch)
-        chars_per_token = 4
-        chunk_chars = self.chunk_size * chars_per_token
-        overlap_chars = self.chunk_overlap * chars_per_token
+        chunk_chars = self._chunk_chars
+        overlap_chars = self._overlap_chars
+        text_len = len(text)
+        
+        # Fast-Path: kurze Texte (E-Mails, Notizen) passen in einen einzigen Chunk
+        if text_len <= chunk_chars:
+            return [DocumentChunk(
+                id=f"{doc_id}_chunk_0",
+                content=text,
+                metadata={
+                    "chunk_index": 0,
+                    "chunk_start": 0,
+                    "chunk_end": text_len
+                },
+                base_metadata=base_metadata
+            )]
+        
+        snap = self._snap
         
         chunks = []
-        start = 0
         chunk_index = 0
         
-        while start < len(text):
-            end = start + chunk_chars
+        # Letzter Start: der vorherige Chunk reicht noch nicht bis ans Textende
+        for start in range(0, text_len - overlap_chars, self._step):
+            end = min(start + chunk_chars, text_len)
             
-            # Versuche an Satzende zu brechen
-            if end < len(text):
-                # Suche nach Satzende in den letzten 20% des Chunks
-                search_start = start + int(chunk_chars * 0.8)
-                search_region = text[search_start:end]
-                
-                # Finde letztes Satzende
-                for sep in [". ", "! ", "? ", "\n"]:
-                    last_sep = search_region.rfind(sep)
-                    if last_sep != -1:
-                        end = search_start + last_sep + len(sep)
-                        break
+            # Ende auf das nächste Leerzeichen davor ziehen (nicht mitten im Wort)
+            if end < text_len:
+                space = text.rfind(" ", end - snap, end)
+                if space > start:
+                    end = space
             
             chunk_text = text[start:end].strip()
             
             if chunk_text:
-                chunk_id = f"{doc_id}_chunk_{chunk_index}"
-                
-                chunk_metadata = base_metadata.copy()
-                chunk_metadata.update({
-                    "chunk_index": chunk_index,
-                    "chunk_start": start,
-                    "chunk_end": end
-                })
-                
                 chunks.append(DocumentChunk(
-                    id=chunk_id,
+                    id=f"{doc_id}_chunk_{chunk_index}",
                     content=chunk_text,
-                    metadata=chunk_metadata
+                    metadata={
+                        "chunk_index": chunk_index,
+                        "chunk_start": start,
+                        "chunk_end": end
+                    },
+                    base_metadata=base_metadata
                 ))
-                
                 chunk_index += 1
-            
-            # Nächster Start mit Überlappung
-            start = end - overlap_chars
-            if start <= 0 and chunk_index > 0:
-                start = end
         
         return chunks
     
     def _generate_doc_id(self, file_path: Path, content: str) -> str:
         """Generiert eindeutige Dokument-ID"""
         hash_input = f"{file_path.name}_{len(content)}_{content[:1000]}"
-        return hashlib.md5(hash_input.encode()).hexdigest()[:16]
+        return self._short_hash(hash_input)
     
     def _generate_doc_id_from_bytes(self, content: bytes, filename: str) -> str:
         """Generiert eindeutige Dokument-ID aus Bytes"""
         hash_input = f"{filename}_{len(content)}_{content[:1000]}"
-        return hashlib.md5(hash_input.encode() if isinstance(hash_input, str) else hash_input).hexdigest()[:16]
+        return self._short_hash(hash_input)
+
+    @staticmethod
+    def _short_hash(hash_input: str) -> str:
+        """16-stelliger Hex-Hash für IDs (xxh3 falls installiert, sonst MD5)"""
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_64_hexdigest(hash_input.encode())
+        return hashlib.md5(hash_input.encode()).hexdigest()[:16]
 
 
 # Globale Instanz
@@ -3,13 +3,57 @@ KMU Knowledge Assistant - Embedding-Modul
 Dual-Embedding Support: Lokale Embeddings via Ollama UND Cloud via OpenAI
 """
 
+import json
+import time
+import atexit
+import hashlib
+import sqlite3
+import threading
 import httpx
 import numpy as np
-from typing import List, Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Callable, List, Optional, Dict, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
-from app.config import config, EmbeddingMode
+from app.config import config, EmbeddingMode, DATA_DIR
+
+# Max. Schlüssel pro SQL-Abfrage im Embedding-Cache (SQLite-Parameterlimit)
+_CACHE_ABFRAGE_MAX = 900
+
+# Beim Verdrängen wird der Cache auf diesen Anteil von cache_max_entries gekürzt,
+# damit nicht jeder weitere Eintrag erneut eine Verdrängung auslöst
+_CACHE_FUELLGRAD_NACH_VERDRAENGUNG = 0.9
+
+# Schnellere JSON-Serialisierung für grosse Embedding-Requests (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# HTTP/2 für den Embedding-Client (optional, braucht das Paket h2)
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+
+def _json_body(payload: Dict) -> bytes:
+    """Request-Body als JSON-Bytes (orjson falls installiert)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _json_response(response: httpx.Response) -> Dict:
+    """Response-Body parsen (orjson falls installiert)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
 
 
 class EmbeddingProvider(Enum):
@@ -21,7 +65,7 @@ class EmbeddingProvider(Enum):
 @dataclass
 class EmbeddingResult:
     """Embedding-Ergebnis"""
-    embeddings: List[List[float]]
+    embeddings: List[List[float]]  # L2-normiert, float32-Genauigkeit
     model: str
     provider: str
     dimensions: int
@@ -57,6 +101,25 @@ class EmbeddingService:
         self.local_model = config.embedding.local_model
         self.openai_model = config.embedding.openai_model
         self.mode = EmbeddingMode.API_ONLY  # Nur API
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        self.cache_path = DATA_DIR / "embedding_cache.db"
+        self._cache_init = False
+        # Geschätzte Anzahl Einträge im Cache (None = noch nicht gezählt)
+        self._cache_anzahl: Optional[int] = None
+
+    def _http(self) -> httpx.Client:
+        """Gemeinsamer HTTP-Client (Keep-Alive statt neuer TLS-Verbindung pro Request)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        http2=H2_AVAILABLE,
+                        timeout=30.0,
+                        limits=httpx.Limits(max_keepalive_connections=config.embedding.max_parallel_requests)
+                    )
+                    atexit.register(self._client.close)
+        return self._client
 
     def ollama_available(self) -> bool:
         """Ollama deaktiviert - nur API"""
@@ -84,19 +147,7 @@ class EmbeddingService:
             return None
 
         try:
-            embeddings = []
-            for text in texts:
-                response = httpx.post(
-                    f"{self.ollama_host}/api/embeddings",
-                    json={
-                        "model": self.local_model,
-                        "prompt": text
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                embeddings.append(data["embedding"])
+            embeddings = self._mit_cache("local", self.local_model, texts, self._post_local_embeddings)
 
             return EmbeddingResult(
                 embeddings=embeddings,
@@ -117,22 +168,7 @@ class EmbeddingService:
             return None
 
         try:
-            response = httpx.post(
-                "https://api.openai.com/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {config.llm.openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.openai_model,
-                    "input": texts
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            embeddings = [item["embedding"] for item in data["data"]]
+            embeddings = self._mit_cache("openai", self.openai_model, texts, self._embed_openai_uncached)
 
             return EmbeddingResult(
                 embeddings=embeddings,
@@ -144,6 +180,173 @@ class EmbeddingService:
             print(f"Fehler bei OpenAI Embedding: {e}")
             return None
 
+    def _post_local_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Ein Ollama-Request pro Text"""
+        embeddings = []
+        for text in texts:
+            response = self._http().post(
+                f"{self.ollama_host}/api/embeddings",
+                headers={"Content-Type": "application/json"},
+                content=_json_body({
+                    "model": self.local_model,
+                    "prompt": text
+                }),
+                timeout=30.0
+            )
+            response.raise_for_status()
+            data = _json_response(response)
+            embeddings.append(data["embedding"])
+        return self.normalize_matrix(embeddings).tolist()
+
+    def _embed_openai_uncached(self, texts: List[str]) -> List[List[float]]:
+        """OpenAI-Embeddings ohne Cache, grosse Aufträge in parallelen Batches"""
+        batches = self._openai_batches(texts)
+        if len(batches) == 1:
+            return self._post_openai_embeddings(texts)
+
+        # Mehrere Requests parallel; map() behält die Reihenfolge bei
+        workers = min(config.embedding.max_parallel_requests, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            teile = executor.map(
+                lambda batch: self._post_openai_embeddings(texts[batch[0]:batch[1]]),
+                batches
+            )
+            return [embedding for teil in teile for embedding in teil]
+
+    def _openai_batches(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """Teilt texts in aufeinanderfolgende Bereiche (start, end) innerhalb der API-Limits"""
+        max_tokens = config.embedding.max_batch_tokens
+        max_inputs = config.embedding.max_batch_inputs
+        batches = []
+        start = 0
+        tokens = 0
+        for i, text in enumerate(texts):
+            text_tokens = len(text) // 4 + 1
+            if i > start and (tokens + text_tokens > max_tokens or i - start >= max_inputs):
+                batches.append((start, i))
+                start = i
+                tokens = 0
+            tokens += text_tokens
+        batches.append((start, len(texts)))
+        return batches
+
+    def _post_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Ein Request an die OpenAI Embeddings API"""
+        response = self._http().post(
+            "https://api.openai.com/v1/embeddings",
+            headers={
+                "Authorization": f"Bearer {config.llm.openai_api_key}",
+                "Content-Type": "application/json"
+            },
+            content=_json_body({
+                "model": self.openai_model,
+                "input": texts
+            }),
+            timeout=30.0
+        )
+        response.raise_for_status()
+        data = _json_response(response)
+
+        return self.normalize_matrix([item["embedding"] for item in data["data"]]).tolist()
+
+    # ============ Embedding-Cache ============
+
+    def _cache_db(self) -> sqlite3.Connection:
+        """Verbindung zum Embedding-Cache (key -> float32-Vektor), beim ersten Mal angelegt"""
+        if not self._cache_init:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(sqlite3.connect(self.cache_path)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings "
+                    "(key TEXT PRIMARY KEY, vektor BLOB, zugriff REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_zugriff ON embeddings (zugriff)")
+            self._cache_init = True
+        return sqlite3.connect(self.cache_path)
+
+    @staticmethod
+    def _cache_key(provider: str, model: str, text: str) -> str:
+        """Cache-Schlüssel: gleicher Text mit gleichem Modell -> gleiches Embedding"""
+        return hashlib.blake2b(f"{provider}:{model}:{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+    def _mit_cache(
+        self,
+        provider: str,
+        model: str,
+        texts: List[str],
+        embed: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """
+        Holt bekannte Embeddings aus dem Cache und ruft embed() nur für die übrigen Texte auf.
+        Bei einem erneut hochgeladenen Dokument entfällt so der API-Aufruf ganz.
+        """
+        max_eintraege = config.embedding.cache_max_entries
+        if max_eintraege <= 0:
+            return embed(texts)
+
+        keys = [self._cache_key(provider, model, text) for text in texts]
+        gefunden = {}
+        try:
+            with closing(self._cache_db()) as conn, conn:
+                eindeutig = list(dict.fromkeys(keys))
+                for i in range(0, len(eindeutig), _CACHE_ABFRAGE_MAX):
+                    teil = eindeutig[i:i + _CACHE_ABFRAGE_MAX]
+                    platzhalter = ",".join("?" * len(teil))
+                    gefunden.update(conn.execute(
+                        f"SELECT key, vektor FROM embeddings WHERE key IN ({platzhalter})", teil
+                    ))
+                    # Zugriffszeit für die LRU-Verdrängung
+                    conn.execute(
+                        f"UPDATE embeddings SET zugriff = ? WHERE key IN ({platzhalter})",
+                        [time.time(), *teil]
+                    )
+        except sqlite3.Error as e:
+            print(f"Embedding-Cache Fehler: {e}")
+            return embed(texts)
+
+        fehlend = [i for i, key in enumerate(keys) if key not in gefunden]
+        neu = embed([texts[i] for i in fehlend]) if fehlend else []
+        if len(neu) != len(fehlend):
+            raise ValueError(f"{len(neu)} Embeddings für {len(fehlend)} Texte erhalten")
+
+        embeddings = [
+            None if key not in gefunden else np.frombuffer(gefunden[key], dtype=np.float32).tolist()
+            for key in keys
+        ]
+        for i, embedding in zip(fehlend, neu):
+            embeddings[i] = embedding
+
+        if fehlend:
+            try:
+                jetzt = time.time()
+                with closing(self._cache_db()) as conn, conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                        [(keys[i], np.asarray(embedding, dtype=np.float32).tobytes(), jetzt)
+                         for i, embedding in zip(fehlend, neu)]
+                    )
+                    # Laufender Zähler statt COUNT(*) pro Cache-Miss; gezählt wird
+                    # nur beim ersten Schreiben und wenn der Cache voll scheint
+                    if self._cache_anzahl is None:
+                        (self._cache_anzahl,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                    else:
+                        self._cache_anzahl += len({keys[i] for i in fehlend})
+                    if self._cache_anzahl > max_eintraege:
+                        # Älteste Einträge verdrängen (andere Prozesse schreiben mit -> genau zählen)
+                        (anzahl,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                        ziel = int(max_eintraege * _CACHE_FUELLGRAD_NACH_VERDRAENGUNG)
+                        if anzahl > max_eintraege:
+                            anzahl -= conn.execute(
+                                "DELETE FROM embeddings WHERE key IN "
+                                "(SELECT key FROM embeddings ORDER BY zugriff LIMIT ?)",
+                                (anzahl - ziel,)
+                            ).rowcount
+                        self._cache_anzahl = anzahl
+            except sqlite3.Error as e:
+                print(f"Embedding-Cache Fehler: {e}")
+
+        return embeddings
+
     # ============ Dual-Embedding ============
 
     def embed_dual(self, texts: List[str]) -> DualEmbeddingResult:
@@ -232,11 +435,45 @@ class EmbeddingService:
 
     # ============ Utilities ============
 
+    @staticmethod
+    def normalize_matrix(embeddings) -> np.ndarray:
+        """
+        Baut eine float32-Matrix (N, D) mit L2-normierten Zeilen.
+
+        Einmal pro Korpus aufrufen; danach ist jede Kosinus-Ähnlichkeit
+        gegen den Korpus ein einziges Matrix-Vektor-Produkt.
+        """
+        matrix = np.array(embeddings, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def cosine_similarity_batch(self, query, matrix: np.ndarray) -> np.ndarray:
+        """
+        Kosinus-Ähnlichkeit einer Anfrage zu allen Zeilen einer Matrix.
+
+        Args:
+            query: Anfrage-Vektor
+            matrix: Korpus aus normalize_matrix()
+
+        Returns:
+            Array (N,) mit den Ähnlichkeiten
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return np.zeros(len(matrix), dtype=np.float32)
+        return matrix @ (q / norm)
+
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Berechnet Kosinus-Ähnlichkeit zwischen zwei Vektoren"""
-        a = np.array(vec1)
-        b = np.array(vec2)
-        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+        """
+        Kosinus-Ähnlichkeit zweier Embeddings dieses Services.
+
+        Die Provider liefern bereits L2-normierte float32-Vektoren, daher genügt
+        das Skalarprodukt. Für beliebige Vektoren cosine_similarity_batch() nutzen.
+        """
+        return float(np.dot(np.asarray(vec1, dtype=np.float32), np.asarray(vec2, dtype=np.float32)))
 
 
 # Globale Instanz
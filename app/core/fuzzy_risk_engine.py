@@ -3,11 +3,15 @@ Baloise Fuzzy Risk Scoring Engine
 Bewertet Schadensmeldungen mit Fuzzy-Logik für Risiko-Analyse
 """
 
+import heapq
+from bisect import bisect_right
 import numpy as np
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple, Optional
 from enum import Enum
 from datetime import datetime, date
+from functools import lru_cache
+from operator import attrgetter, itemgetter
 
 
 class RiskLevel(Enum):
@@ -19,7 +23,145 @@ class RiskLevel(Enum):
     SEHR_HOCH = "Sehr hoch"
 
 
-@dataclass
+# Linguistische Mengen je Eingabe-Variable (Variable 0-4 wie in analyse())
+_MENGEN = (
+    ("niedrig", "mittel", "hoch", "sehr_hoch"),          # Schadenshöhe
+    ("sehr_kurz", "kurz", "mittel", "lang"),             # Vertragsdauer
+    ("keine", "wenige", "mehrere", "viele"),             # Vorherige Schäden
+    ("normal", "randzeit", "nacht"),                     # Schadenszeitpunkt
+    ("lueckenhaft", "teilweise", "vollstaendig"),        # Vollständigkeit
+)
+
+# Feste Indizes der Mengen in den Zugehörigkeits-Arrays der fuzzify_*-Methoden
+HOEHE_NIEDRIG, HOEHE_MITTEL, HOEHE_HOCH, HOEHE_SEHR_HOCH = range(4)
+DAUER_SEHR_KURZ, DAUER_KURZ, DAUER_MITTEL, DAUER_LANG = range(4)
+VORHERIGE_KEINE, VORHERIGE_WENIGE, VORHERIGE_MEHRERE, VORHERIGE_VIELE = range(4)
+ZEIT_NORMAL, ZEIT_RANDZEIT, ZEIT_NACHT = range(3)
+VOLLST_LUECKENHAFT, VOLLST_TEILWEISE, VOLLST_VOLLSTAENDIG = range(3)
+
+# Anzeigenamen der Mengen für die Faktoren ("sehr_hoch" -> "Sehr Hoch")
+_LABELS = tuple(tuple(name.replace("_", " ").title() for name in namen) for namen in _MENGEN)
+
+# Fuzzy-Regeln in Auswertungsreihenfolge: (Risiko-Level, Beschreibung)
+_REGELN = (
+    ("sehr_hoch", "Sehr hoher Schaden kurz nach Vertragsabschluss"),
+    ("hoch", "Hoher Schaden in kurzer Vertragsdauer"),
+    ("hoch", "Häufige Schadensmeldungen mit hohen Beträgen"),
+    ("hoch", "Unvollständige Angaben bei hohem Schaden"),
+    ("mittel_hoch", "Hoher Schaden zur Nachtzeit"),
+    ("mittel", "Mittlerer Schaden bei kurzer Vertragsdauer"),
+    ("mittel", "Mehrere vorherige Schadensmeldungen"),
+    ("mittel", "Teilweise unvollständige Angaben"),
+    ("niedrig", "Niedriger Schaden bei langjährigem Kunden"),
+    ("sehr_niedrig", "Vollständige Angaben, normaler Zeitpunkt"),
+    ("niedrig", "Erster Schaden, moderate Höhe"),
+)
+
+# Risiko-Level zu numerischen Werten (Defuzzifizierung)
+_LEVEL_VALUES = {
+    "sehr_niedrig": 10,
+    "niedrig": 25,
+    "mittel": 50,
+    "mittel_hoch": 65,
+    "hoch": 75,
+    "sehr_hoch": 95
+}
+
+# Bedingungen der Regeln (gleiche Reihenfolge wie _REGELN) als (Variable, Menge):
+# Aktivierung = min(wenn, max(und, oder)) * Gewicht; ohne Oder-Teil ist oder = und
+_REGEL_BEDINGUNGEN = (
+    # === HOHE RISIKO REGELN ===
+    # Regel 1: Sehr hoher Schaden + sehr kurze Vertragsdauer = SEHR HOHES Risiko
+    ((0, HOEHE_SEHR_HOCH), (1, DAUER_SEHR_KURZ), (1, DAUER_SEHR_KURZ), 1.0),
+    # Regel 2: Hoher Schaden + kurze Vertragsdauer = HOHES Risiko
+    ((0, HOEHE_HOCH), (1, DAUER_KURZ), (1, DAUER_KURZ), 1.0),
+    # Regel 3: Viele vorherige Schäden + hoher aktueller Schaden = HOHES Risiko
+    ((2, VORHERIGE_VIELE), (0, HOEHE_HOCH), (0, HOEHE_HOCH), 1.0),
+    # Regel 4: Lückenhafte Angaben + hoher Schaden = HOHES Risiko
+    ((4, VOLLST_LUECKENHAFT), (0, HOEHE_HOCH), (0, HOEHE_HOCH), 1.0),
+    # Regel 5: Nachtzeit + hoher Schaden = MITTLERES-HOHES Risiko
+    ((3, ZEIT_NACHT), (0, HOEHE_HOCH), (0, HOEHE_HOCH), 1.0),
+    # === MITTLERE RISIKO REGELN ===
+    # Regel 6: Mittlerer Schaden + kurze Vertragsdauer
+    ((0, HOEHE_MITTEL), (1, DAUER_KURZ), (1, DAUER_KURZ), 1.0),
+    # Regel 7: Mehrere vorherige Schäden
+    ((2, VORHERIGE_MEHRERE), (2, VORHERIGE_MEHRERE), (2, VORHERIGE_MEHRERE), 1.0),
+    # Regel 8: Teilweise vollständige Angaben + mittlerer Schaden (abgeschwächt)
+    ((4, VOLLST_TEILWEISE), (0, HOEHE_MITTEL), (0, HOEHE_MITTEL), 0.7),
+    # === NIEDRIGE RISIKO REGELN ===
+    # Regel 9: Niedriger Schaden + lange Vertragsdauer = NIEDRIGES Risiko
+    ((0, HOEHE_NIEDRIG), (1, DAUER_LANG), (1, DAUER_LANG), 1.0),
+    # Regel 10: Vollständige Angaben + normale Zeit = positiver Faktor
+    ((4, VOLLST_VOLLSTAENDIG), (3, ZEIT_NORMAL), (3, ZEIT_NORMAL), 1.0),
+    # Regel 11: Keine vorherigen Schäden + mittlerer/niedriger Schaden
+    ((2, VORHERIGE_KEINE), (0, HOEHE_NIEDRIG), (0, HOEHE_MITTEL), 1.0),
+)
+
+
+def _zeitpunkt_zugehoerigkeit(stunde: int) -> Tuple[float, float, float]:
+    """(normal, randzeit, nacht) für eine volle Stunde 0-23"""
+    # Nachtzeit (22-6) ist verdächtiger für gewisse Schäden
+    if stunde >= 22 or stunde < 6:
+        return (0.0, 0.0, 1.0)
+    elif 6 <= stunde < 8 or 18 <= stunde < 22:
+        return (0.3, 1.0, 0.0)
+    else:  # 8-18 Uhr
+        return (1.0, 0.0, 0.0)
+
+
+@lru_cache(maxsize=1024)
+def _simulierte_vertragsdauer(polizennummer: str) -> int:
+    """Simulierte Vertragsdauer in Tagen aus der Policennummer (Demo, in Produktion aus CRM)"""
+    return hash(polizennummer) % 1000 + 30
+
+
+# Von analyse_schadensmeldung gelesene Felder der Schadensmeldung
+_MELDUNG_FELDNAMEN = ("geschaetzter_betrag", "polizennummer", "schadenszeit", "schadenstyp")
+_MELDUNG_FELDER = attrgetter(*_MELDUNG_FELDNAMEN)
+
+# Tageszeit-Stichworte in der Schadenszeit ohne Uhrzeit, in Prüfreihenfolge
+_TAGESZEITEN = (("nacht", 2), ("morgen", 7), ("mittag", 12), ("abend", 20))
+
+# Felder der Vollständigkeitsprüfung als Bits; wichtige Felder zählen doppelt
+_WICHTIGE_FELDER = (
+    "schadenstyp", "schadensdatum", "schadensort",
+    "schadensbeschreibung", "kontakt_telefon", "kontakt_email",
+)
+_OPTIONALE_FELDER = ("polizennummer", "schadenszeit", "schadensursache", "geschaetzter_betrag")
+_FELD_BITS = {feld: 1 << i for i, feld in enumerate(_WICHTIGE_FELDER + _OPTIONALE_FELDER)}
+_WICHTIG_MASKE = (1 << len(_WICHTIGE_FELDER)) - 1
+_MAX_VOLLSTAENDIGKEIT = len(_WICHTIGE_FELDER) * 2 + len(_OPTIONALE_FELDER)
+
+# Zugehörigkeiten normal/randzeit/nacht je Stunde. Alle Grenzen liegen auf vollen
+# Stunden, daher gilt die Zeile floor(stunde % 24) auch für Bruchteile von Stunden.
+_ZEIT_TABELLE = tuple(_zeitpunkt_zugehoerigkeit(h) for h in range(24))
+
+
+# Risikostufen nach Score: unter 20, unter 40, unter 60, unter 80, ab 80
+_STUFEN_GRENZEN = (20.0, 40.0, 60.0, 80.0)
+_STUFEN = (RiskLevel.SEHR_NIEDRIG, RiskLevel.NIEDRIG, RiskLevel.MITTEL,
+           RiskLevel.HOCH, RiskLevel.SEHR_HOCH)
+
+# Handlungsempfehlung je Risikostufe
+_EMPFEHLUNGEN = {
+    RiskLevel.SEHR_NIEDRIG: "Standardbearbeitung. Automatische Freigabe möglich.",
+    RiskLevel.NIEDRIG: "Standardbearbeitung. Stichprobenartige Prüfung empfohlen.",
+    RiskLevel.MITTEL: "Manuelle Prüfung empfohlen. Dokumentation vervollständigen.",
+    RiskLevel.HOCH: "Detailprüfung erforderlich. Senior-Sachbearbeiter einbeziehen.",
+    RiskLevel.SEHR_HOCH: "Sofortige Eskalation. Betrugsprüfung durch Spezialteam."
+}
+
+# Anzeigefarbe je Risikostufe
+_FARBEN = {
+    RiskLevel.SEHR_NIEDRIG: "#22c55e",  # Grün
+    RiskLevel.NIEDRIG: "#84cc16",       # Hellgrün
+    RiskLevel.MITTEL: "#eab308",        # Gelb
+    RiskLevel.HOCH: "#f97316",          # Orange
+    RiskLevel.SEHR_HOCH: "#ef4444"      # Rot
+}
+
+
+@dataclass(slots=True)
 class FuzzyResult:
     """Ergebnis der Fuzzy-Risikobewertung"""
     score: float  # 0-100
@@ -31,20 +173,16 @@ class FuzzyResult:
     @property
     def farbe(self) -> str:
         """Farbe basierend auf Risikostufe"""
-        colors = {
-            RiskLevel.SEHR_NIEDRIG: "#22c55e",  # Grün
-            RiskLevel.NIEDRIG: "#84cc16",       # Hellgrün
-            RiskLevel.MITTEL: "#eab308",        # Gelb
-            RiskLevel.HOCH: "#f97316",          # Orange
-            RiskLevel.SEHR_HOCH: "#ef4444"      # Rot
-        }
-        return colors.get(self.level, "#6b7280")
+        return _FARBEN.get(self.level, "#6b7280")
 
 
 class FuzzyMembershipFunctions:
     """
     Fuzzy Zugehörigkeitsfunktionen
     Definiert wie crisp Werte zu fuzzy Mengen gehören
+
+    Verzweigungsfrei: jede Funktion ist das auf [0, 1] begrenzte Minimum ihrer
+    Flanken. Erwartet streng steigende Parameter (a < b < c bzw. a < b, c < d).
     """
 
     @staticmethod
@@ -53,12 +191,7 @@ class FuzzyMembershipFunctions:
         Dreieckige Zugehörigkeitsfunktion
         a = linker Fuss, b = Spitze, c = rechter Fuss
         """
-        if x <= a or x >= c:
-            return 0.0
-        elif a < x <= b:
-            return (x - a) / (b - a)
-        else:  # b < x < c
-            return (c - x) / (c - b)
+        return max(0.0, min((x - a) / (b - a), (c - x) / (c - b)))
 
     @staticmethod
     def trapezoidal(x: float, a: float, b: float, c: float, d: float) -> float:
@@ -66,34 +199,17 @@ class FuzzyMembershipFunctions:
         Trapezförmige Zugehörigkeitsfunktion
         a = linker Fuss, b = linke Schulter, c = rechte Schulter, d = rechter Fuss
         """
-        if x <= a or x >= d:
-            return 0.0
-        elif a < x < b:
-            return (x - a) / (b - a)
-        elif b <= x <= c:
-            return 1.0
-        else:  # c < x < d
-            return (d - x) / (d - c)
+        return max(0.0, min((x - a) / (b - a), 1.0, (d - x) / (d - c)))
 
     @staticmethod
     def left_shoulder(x: float, a: float, b: float) -> float:
         """Linke Schulter - hoch links, fällt nach rechts"""
-        if x <= a:
-            return 1.0
-        elif x >= b:
-            return 0.0
-        else:
-            return (b - x) / (b - a)
+        return max(0.0, min(1.0, (b - x) / (b - a)))
 
     @staticmethod
     def right_shoulder(x: float, a: float, b: float) -> float:
         """Rechte Schulter - niedrig links, steigt nach rechts"""
-        if x <= a:
-            return 0.0
-        elif x >= b:
-            return 1.0
-        else:
-            return (x - a) / (b - a)
+        return max(0.0, min(1.0, (x - a) / (b - a)))
 
 
 class FuzzyRiskEngine:
@@ -114,191 +230,171 @@ class FuzzyRiskEngine:
     def __init__(self):
         self.mf = FuzzyMembershipFunctions()
 
-    def fuzzify_schadenshoehe(self, betrag: float) -> Dict[str, float]:
+        # Trapez-Parameter (a, b, c, d) je Variable und Menge:
+        # Dreieck (a, b, c) = (a, b, b, c), linke Schulter (a, b) = (-inf, -inf, a, b),
+        # rechte Schulter (a, b) = (a, b, inf, inf). Der Zeitpunkt ist keine
+        # Trapezfunktion und wird aus _ZEIT_TABELLE gelesen.
+        inf = float("inf")
+        trapeze = (
+            # Schadenshöhe (CHF)
+            ((-inf, -inf, 1000, 3000), (2000, 7000, 7000, 15000),
+             (10000, 30000, 30000, 60000), (40000, 80000, inf, inf)),
+            # Vertragsdauer (Tage)
+            ((-inf, -inf, 14, 45), (30, 90, 90, 180), (120, 270, 270, 400), (300, 500, inf, inf)),
+            # Vorherige Schäden
+            ((-inf, -inf, 0.5, 1.5), (0.5, 1.5, 1.5, 3), (2, 3.5, 3.5, 5), (3.5, 6, inf, inf)),
+            # Schadenszeitpunkt (separat)
+            (),
+            # Vollständigkeit (%)
+            ((-inf, -inf, 40, 60), (50, 70, 70, 90), (80, 95, inf, inf)),
+        )
+
+        # Kehrwerte der Flankenbreiten 1/(b-a) und 1/(d-c) einmalig vorberechnen
+        # (0 bei senkrechter Flanke) -> je Menge (a, b, c, d, 1/(b-a), 1/(d-c))
+        self._mf_tabelle = tuple(
+            tuple(
+                (float(a), float(b), float(c), float(d),
+                 1.0 / (b - a) if b > a else 0.0, 1.0 / (d - c) if d > c else 0.0)
+                for a, b, c, d in mengen
+            )
+            for mengen in trapeze
+        )
+
+        # Einzelanalysen je Eingabe-Tupel merken: die UI bewertet dieselbe Meldung
+        # bei jedem Rerender neu. Pro Instanz, damit der Cache keine Engine festhält.
+        self._auswerten_einzeln = lru_cache(maxsize=4096)(self._berechne_einzeln)
+
+    def _fuzzify_werte(self, variable: int, wert: float) -> Tuple[float, ...]:
+        """Zugehörigkeiten einer Eingabe-Variable (skalar), Mengen in der Reihenfolge von _MENGEN"""
+        x = float(wert)
+        if variable == 3:
+            stunde = x % 24.0
+            if stunde != stunde:  # NaN/inf: wie bisher "normal"
+                return (1.0, 0.0, 0.0)
+            return _ZEIT_TABELLE[int(stunde) % 24]
+        werte = []
+        for a, b, c, d, inv_steigend, inv_fallend in self._mf_tabelle[variable]:
+            # Bei senkrechter Flanke (Schulter) ist die Flanke ganz 1 bzw. 0;
+            # min/max als Vergleiche ausgeschrieben
+            steigend = (x - a) * inv_steigend if b > a else (1.0 if x >= b else 0.0)
+            fallend = (d - x) * inv_fallend if d > c else (1.0 if x <= c else 0.0)
+            mu = steigend if steigend < fallend else fallend
+            werte.append(0.0 if mu < 0.0 else 1.0 if mu > 1.0 else mu)
+        return tuple(werte)
+
+    def _fuzzify(self, variable: int, wert: float) -> np.ndarray:
+        """Zugehörigkeiten einer Eingabe-Variable als Array"""
+        return np.array(self._fuzzify_werte(variable, wert))
+
+    def fuzzify_schadenshoehe(self, betrag: float) -> np.ndarray:
         """
         Fuzzifizierung der Schadenshöhe
 
-        Linguistische Variablen:
+        Linguistische Variablen (Indizes HOEHE_*):
         - niedrig: 0 - 2000 CHF
         - mittel: 1000 - 10000 CHF
         - hoch: 5000 - 50000 CHF
         - sehr_hoch: > 30000 CHF
         """
-        return {
-            "niedrig": self.mf.left_shoulder(betrag, 1000, 3000),
-            "mittel": self.mf.triangular(betrag, 2000, 7000, 15000),
-            "hoch": self.mf.triangular(betrag, 10000, 30000, 60000),
-            "sehr_hoch": self.mf.right_shoulder(betrag, 40000, 80000)
-        }
+        return self._fuzzify(0, betrag)
 
-    def fuzzify_vertragsdauer(self, tage: int) -> Dict[str, float]:
+    def fuzzify_vertragsdauer(self, tage: int) -> np.ndarray:
         """
         Fuzzifizierung der Vertragsdauer
 
-        Linguistische Variablen:
+        Linguistische Variablen (Indizes DAUER_*):
         - sehr_kurz: < 30 Tage (verdächtig)
         - kurz: 30 - 180 Tage
         - mittel: 90 - 365 Tage
         - lang: > 180 Tage (weniger verdächtig)
         """
-        return {
-            "sehr_kurz": self.mf.left_shoulder(tage, 14, 45),
-            "kurz": self.mf.triangular(tage, 30, 90, 180),
-            "mittel": self.mf.triangular(tage, 120, 270, 400),
-            "lang": self.mf.right_shoulder(tage, 300, 500)
-        }
+        return self._fuzzify(1, tage)
 
-    def fuzzify_vorherige_schaeden(self, anzahl: int) -> Dict[str, float]:
+    def fuzzify_vorherige_schaeden(self, anzahl: int) -> np.ndarray:
         """
         Fuzzifizierung der Anzahl vorheriger Schäden
 
-        Linguistische Variablen:
+        Linguistische Variablen (Indizes VORHERIGE_*):
         - keine: 0
         - wenige: 1-2
         - mehrere: 2-4
         - viele: > 3
         """
-        return {
-            "keine": self.mf.left_shoulder(anzahl, 0.5, 1.5),
-            "wenige": self.mf.triangular(anzahl, 0.5, 1.5, 3),
-            "mehrere": self.mf.triangular(anzahl, 2, 3.5, 5),
-            "viele": self.mf.right_shoulder(anzahl, 3.5, 6)
-        }
+        return self._fuzzify(2, anzahl)
 
-    def fuzzify_zeitpunkt(self, stunde: int) -> Dict[str, float]:
+    def fuzzify_zeitpunkt(self, stunde: int) -> np.ndarray:
         """
         Fuzzifizierung des Schadenszeitpunkts
 
-        Linguistische Variablen:
+        Linguistische Variablen (Indizes ZEIT_*):
         - normal: Geschäftszeiten (8-18 Uhr)
         - randzeit: Früh/Spät (6-8, 18-22 Uhr)
         - nacht: Nachtzeit (22-6 Uhr)
         """
-        # Normalisiere auf 0-24
-        stunde = stunde % 24
-
-        # Nachtzeit (22-6) ist verdächtiger für gewisse Schäden
-        if stunde >= 22 or stunde < 6:
-            nacht = 1.0
-            randzeit = 0.0
-            normal = 0.0
-        elif 6 <= stunde < 8 or 18 <= stunde < 22:
-            nacht = 0.0
-            randzeit = 1.0
-            normal = 0.3
-        else:  # 8-18 Uhr
-            nacht = 0.0
-            randzeit = 0.0
-            normal = 1.0
-
-        return {
-            "normal": normal,
-            "randzeit": randzeit,
-            "nacht": nacht
-        }
+        return self._fuzzify(3, stunde)
 
-    def fuzzify_vollstaendigkeit(self, prozent: float) -> Dict[str, float]:
+    def fuzzify_vollstaendigkeit(self, prozent: float) -> np.ndarray:
         """
         Fuzzifizierung der Angaben-Vollständigkeit
 
-        Linguistische Variablen:
+        Linguistische Variablen (Indizes VOLLST_*):
         - lueckenhaft: < 50%
         - teilweise: 40-80%
         - vollstaendig: > 70%
         """
-        return {
-            "lueckenhaft": self.mf.left_shoulder(prozent, 40, 60),
-            "teilweise": self.mf.triangular(prozent, 50, 70, 90),
-            "vollstaendig": self.mf.right_shoulder(prozent, 80, 95)
-        }
+        return self._fuzzify(4, prozent)
 
     def apply_rules(self,
-                    hoehe: Dict[str, float],
-                    dauer: Dict[str, float],
-                    vorherige: Dict[str, float],
-                    zeitpunkt: Dict[str, float],
-                    vollstaendigkeit: Dict[str, float]) -> List[Tuple[float, str, str]]:
+                    hoehe: np.ndarray,
+                    dauer: np.ndarray,
+                    vorherige: np.ndarray,
+                    zeitpunkt: np.ndarray,
+                    vollstaendigkeit: np.ndarray) -> List[Tuple[float, str, str]]:
         """
-        Wendet Fuzzy-Regeln an und gibt aktivierte Regeln zurück
+        Wendet Fuzzy-Regeln auf die Zugehörigkeiten der fuzzify_*-Methoden an
 
         Returns:
             List of (activation_strength, risk_level, rule_description)
         """
-        regeln = []
-
-        # === HOHE RISIKO REGELN ===
-
-        # Regel 1: Sehr hoher Schaden + sehr kurze Vertragsdauer = SEHR HOHES Risiko
-        activation = min(hoehe["sehr_hoch"], dauer["sehr_kurz"])
-        if activation > 0:
-            regeln.append((activation, "sehr_hoch",
-                "Sehr hoher Schaden kurz nach Vertragsabschluss"))
-
-        # Regel 2: Hoher Schaden + kurze Vertragsdauer = HOHES Risiko
-        activation = min(hoehe["hoch"], dauer["kurz"])
-        if activation > 0:
-            regeln.append((activation, "hoch",
-                "Hoher Schaden in kurzer Vertragsdauer"))
-
-        # Regel 3: Viele vorherige Schäden + hoher aktueller Schaden = HOHES Risiko
-        activation = min(vorherige["viele"], hoehe["hoch"])
-        if activation > 0:
-            regeln.append((activation, "hoch",
-                "Häufige Schadensmeldungen mit hohen Beträgen"))
-
-        # Regel 4: Lückenhafte Angaben + hoher Schaden = HOHES Risiko
-        activation = min(vollstaendigkeit["lueckenhaft"], hoehe["hoch"])
-        if activation > 0:
-            regeln.append((activation, "hoch",
-                "Unvollständige Angaben bei hohem Schaden"))
-
-        # Regel 5: Nachtzeit + hoher Schaden = MITTLERES-HOHES Risiko
-        activation = min(zeitpunkt["nacht"], hoehe["hoch"])
-        if activation > 0:
-            regeln.append((activation, "mittel_hoch",
-                "Hoher Schaden zur Nachtzeit"))
-
-        # === MITTLERE RISIKO REGELN ===
-
-        # Regel 6: Mittlerer Schaden + kurze Vertragsdauer
-        activation = min(hoehe["mittel"], dauer["kurz"])
-        if activation > 0:
-            regeln.append((activation, "mittel",
-                "Mittlerer Schaden bei kurzer Vertragsdauer"))
-
-        # Regel 7: Mehrere vorherige Schäden
-        activation = vorherige["mehrere"]
-        if activation > 0:
-            regeln.append((activation, "mittel",
-                "Mehrere vorherige Schadensmeldungen"))
-
-        # Regel 8: Teilweise vollständige Angaben + mittlerer Schaden
-        activation = min(vollstaendigkeit["teilweise"], hoehe["mittel"])
-        if activation > 0:
-            regeln.append((activation * 0.7, "mittel",
-                "Teilweise unvollständige Angaben"))
-
-        # === NIEDRIGE RISIKO REGELN ===
-
-        # Regel 9: Niedriger Schaden + lange Vertragsdauer = NIEDRIGES Risiko
-        activation = min(hoehe["niedrig"], dauer["lang"])
-        if activation > 0:
-            regeln.append((activation, "niedrig",
-                "Niedriger Schaden bei langjährigem Kunden"))
-
-        # Regel 10: Vollständige Angaben + normale Zeit = positiver Faktor
-        activation = min(vollstaendigkeit["vollstaendig"], zeitpunkt["normal"])
-        if activation > 0:
-            regeln.append((activation, "sehr_niedrig",
-                "Vollständige Angaben, normaler Zeitpunkt"))
-
-        # Regel 11: Keine vorherigen Schäden + mittlerer/niedriger Schaden
-        activation = min(vorherige["keine"], max(hoehe["niedrig"], hoehe["mittel"]))
-        if activation > 0:
-            regeln.append((activation, "niedrig",
-                "Erster Schaden, moderate Höhe"))
-
-        return regeln
+        mu = tuple(
+            tuple(map(float, werte))
+            for werte in (hoehe, dauer, vorherige, zeitpunkt, vollstaendigkeit)
+        )
+        return self._aktive_regeln(self._regel_aktivierungen(mu))
+
+    @staticmethod
+    def _regel_aktivierungen(mu: Tuple[Tuple[float, ...], ...]) -> List[float]:
+        """Aktivierung aller Regeln für einen Fall aus den Zugehörigkeiten je Variable"""
+        activations = []
+        for (wv, wm), (uv, um), (ov, om), gewicht in _REGEL_BEDINGUNGEN:
+            # min(wenn, max(und, oder)) als Vergleiche ausgeschrieben
+            wenn, und, oder = mu[wv][wm], mu[uv][um], mu[ov][om]
+            if oder > und:
+                und = oder
+            activations.append((wenn if wenn < und else und) * gewicht)
+        return activations
+
+    @staticmethod
+    def _aktive_regeln(activations) -> List[Tuple[float, str, str]]:
+        """Aktivierte Regeln als (activation_strength, risk_level, rule_description)"""
+        return [
+            (float(activation), *regel)
+            for activation, regel in zip(activations, _REGELN)
+            if activation > 0
+        ]
+
+    def _berechne_einzeln(self, *werte: float) -> Tuple[tuple, tuple, float]:
+        """
+        Zugehörigkeiten je Variable, aktivierte Regeln und Score für einen Fall.
+        Skalar ohne NumPy; nur unveränderliche Werte, da das Ergebnis gecacht wird.
+        """
+        zugehoerigkeiten = tuple(
+            self._fuzzify_werte(variable, wert) for variable, wert in enumerate(werte)
+        )
+        activated_rules = tuple(
+            self._aktive_regeln(self._regel_aktivierungen(zugehoerigkeiten))
+        )
+        return zugehoerigkeiten, activated_rules, self.defuzzify(activated_rules)
 
     def defuzzify(self, activated_rules: List[Tuple[float, str, str]]) -> float:
         """
@@ -308,21 +404,11 @@ class FuzzyRiskEngine:
         if not activated_rules:
             return 25.0  # Default: niedriges Risiko
 
-        # Risiko-Level zu numerischen Werten
-        level_values = {
-            "sehr_niedrig": 10,
-            "niedrig": 25,
-            "mittel": 50,
-            "mittel_hoch": 65,
-            "hoch": 75,
-            "sehr_hoch": 95
-        }
-
         numerator = 0.0
         denominator = 0.0
 
         for activation, level, _ in activated_rules:
-            value = level_values.get(level, 50)
+            value = _LEVEL_VALUES.get(level, 50)
             numerator += activation * value
             denominator += activation
 
@@ -333,59 +419,24 @@ class FuzzyRiskEngine:
 
     def score_to_level(self, score: float) -> RiskLevel:
         """Konvertiert Score zu Risikostufe"""
-        if score < 20:
-            return RiskLevel.SEHR_NIEDRIG
-        elif score < 40:
-            return RiskLevel.NIEDRIG
-        elif score < 60:
-            return RiskLevel.MITTEL
-        elif score < 80:
-            return RiskLevel.HOCH
-        else:
-            return RiskLevel.SEHR_HOCH
+        # bisect_right: ein Score genau auf der Grenze gehört zur höheren Stufe
+        return _STUFEN[bisect_right(_STUFEN_GRENZEN, score)]
 
     def generate_empfehlung(self, level: RiskLevel) -> str:
         """Generiert Handlungsempfehlung basierend auf Risikostufe"""
-        empfehlungen = {
-            RiskLevel.SEHR_NIEDRIG: "Standardbearbeitung. Automatische Freigabe möglich.",
-            RiskLevel.NIEDRIG: "Standardbearbeitung. Stichprobenartige Prüfung empfohlen.",
-            RiskLevel.MITTEL: "Manuelle Prüfung empfohlen. Dokumentation vervollständigen.",
-            RiskLevel.HOCH: "Detailprüfung erforderlich. Senior-Sachbearbeiter einbeziehen.",
-            RiskLevel.SEHR_HOCH: "Sofortige Eskalation. Betrugsprüfung durch Spezialteam."
-        }
-        return empfehlungen.get(level, "Manuelle Prüfung empfohlen.")
+        return _EMPFEHLUNGEN.get(level, "Manuelle Prüfung empfohlen.")
 
     def berechne_vollstaendigkeit(self, meldung_dict: Dict) -> float:
         """Berechnet Vollständigkeit der Angaben in Prozent"""
-        wichtige_felder = [
-            "schadenstyp",
-            "schadensdatum",
-            "schadensort",
-            "schadensbeschreibung",
-            "kontakt_telefon",
-            "kontakt_email"
-        ]
-
-        optionale_felder = [
-            "polizennummer",
-            "schadenszeit",
-            "schadensursache",
-            "geschaetzter_betrag"
-        ]
+        # Bitmaske der ausgefüllten Prüffelder
+        maske = 0
+        for feld in meldung_dict.keys() & _FELD_BITS.keys():
+            if meldung_dict[feld]:
+                maske |= _FELD_BITS[feld]
 
         # Wichtige Felder zählen doppelt
-        score = 0
-        max_score = len(wichtige_felder) * 2 + len(optionale_felder)
-
-        for feld in wichtige_felder:
-            if meldung_dict.get(feld):
-                score += 2
-
-        for feld in optionale_felder:
-            if meldung_dict.get(feld):
-                score += 1
-
-        return (score / max_score) * 100
+        score = maske.bit_count() + (maske & _WICHTIG_MASKE).bit_count()
+        return (score / _MAX_VOLLSTAENDIGKEIT) * 100
 
     def analyse(self,
                 schadenshoehe: float,
@@ -409,18 +460,12 @@ class FuzzyRiskEngine:
             FuzzyResult mit Score, Level, Faktoren und Empfehlung
         """
 
-        # 1. Fuzzifizierung
-        hoehe = self.fuzzify_schadenshoehe(schadenshoehe)
-        dauer = self.fuzzify_vertragsdauer(vertragsdauer_tage)
-        vorherige = self.fuzzify_vorherige_schaeden(vorherige_schaeden)
-        zeitpunkt = self.fuzzify_zeitpunkt(schadenszeitpunkt_stunde)
-        vollstaendigkeit = self.fuzzify_vollstaendigkeit(vollstaendigkeit_prozent)
-
-        # 2. Regelauswertung
-        activated_rules = self.apply_rules(hoehe, dauer, vorherige, zeitpunkt, vollstaendigkeit)
-
-        # 3. Defuzzifizierung
-        score = self.defuzzify(activated_rules)
+        # 1. Fuzzifizierung, 2. Regelauswertung und 3. Defuzzifizierung (gecacht)
+        zugehoerigkeiten, activated_rules, score = self._auswerten_einzeln(
+            float(schadenshoehe), float(vertragsdauer_tage), float(vorherige_schaeden),
+            float(schadenszeitpunkt_stunde), float(vollstaendigkeit_prozent)
+        )
+        hoehe, dauer, vorherige, zeitpunkt, vollstaendigkeit = zugehoerigkeiten
 
         # 4. Risikostufe bestimmen
         level = self.score_to_level(score)
@@ -429,49 +474,49 @@ class FuzzyRiskEngine:
         faktoren = []
 
         # Schadenshöhe
-        max_hoehe = max(hoehe.items(), key=lambda x: x[1])
+        max_hoehe = hoehe.index(max(hoehe))
         faktoren.append({
             "name": "Schadenshöhe",
             "wert": f"{schadenshoehe:,.0f} CHF",
-            "bewertung": max_hoehe[0].replace("_", " ").title(),
-            "zugehoerigkeit": max_hoehe[1],
+            "bewertung": _LABELS[0][max_hoehe],
+            "zugehoerigkeit": hoehe[max_hoehe],
             "einfluss": "hoch" if schadenshoehe > 20000 else "mittel"
         })
 
         # Vertragsdauer
-        max_dauer = max(dauer.items(), key=lambda x: x[1])
+        max_dauer = dauer.index(max(dauer))
         faktoren.append({
             "name": "Vertragsdauer",
             "wert": f"{vertragsdauer_tage} Tage",
-            "bewertung": max_dauer[0].replace("_", " ").title(),
-            "zugehoerigkeit": max_dauer[1],
+            "bewertung": _LABELS[1][max_dauer],
+            "zugehoerigkeit": dauer[max_dauer],
             "einfluss": "hoch" if vertragsdauer_tage < 60 else "niedrig"
         })
 
         # Vorherige Schäden
-        max_vorherige = max(vorherige.items(), key=lambda x: x[1])
+        max_vorherige = vorherige.index(max(vorherige))
         faktoren.append({
             "name": "Vorherige Schäden",
             "wert": str(vorherige_schaeden),
-            "bewertung": max_vorherige[0].replace("_", " ").title(),
-            "zugehoerigkeit": max_vorherige[1],
+            "bewertung": _LABELS[2][max_vorherige],
+            "zugehoerigkeit": vorherige[max_vorherige],
             "einfluss": "hoch" if vorherige_schaeden > 2 else "niedrig"
         })
 
         # Vollständigkeit
-        max_vollst = max(vollstaendigkeit.items(), key=lambda x: x[1])
+        max_vollst = vollstaendigkeit.index(max(vollstaendigkeit))
         faktoren.append({
             "name": "Angaben-Vollständigkeit",
             "wert": f"{vollstaendigkeit_prozent:.0f}%",
-            "bewertung": max_vollst[0].replace("_", " ").title(),
-            "zugehoerigkeit": max_vollst[1],
+            "bewertung": _LABELS[4][max_vollst],
+            "zugehoerigkeit": vollstaendigkeit[max_vollst],
             "einfluss": "mittel" if vollstaendigkeit_prozent < 70 else "niedrig"
         })
 
         # 6. Erklärung generieren
         if activated_rules:
             # Top 3 aktivierte Regeln
-            top_rules = sorted(activated_rules, key=lambda x: x[0], reverse=True)[:3]
+            top_rules = heapq.nlargest(3, activated_rules, key=itemgetter(0))
             erklaerung_parts = [f"• {rule[2]} (Gewicht: {rule[0]:.1%})" for rule in top_rules]
             erklaerung = "Hauptfaktoren:\n" + "\n".join(erklaerung_parts)
         else:
@@ -498,15 +543,23 @@ class FuzzyRiskEngine:
         Returns:
             FuzzyResult
         """
+        # Benötigte Felder in einem Zugriff; fehlende Attribute gelten als leer
+        try:
+            betrag, polizennummer, schadenszeit, schadenstyp = _MELDUNG_FELDER(meldung)
+        except AttributeError:
+            betrag, polizennummer, schadenszeit, schadenstyp = (
+                getattr(meldung, feld, None) for feld in _MELDUNG_FELDNAMEN
+            )
+
         # Schadenshöhe
-        schadenshoehe = getattr(meldung, 'geschaetzter_betrag', 0) or 0
+        schadenshoehe = betrag or 0
 
         # Vertragsdauer (simuliert - in Produktion aus CRM)
         # Für Demo: zufällig basierend auf Policennummer
-        polizennummer = getattr(meldung, 'polizennummer', '') or ''
+        polizennummer = polizennummer or ''
         if polizennummer and polizennummer != 'unbekannt':
-            # Simuliere Vertragsdauer basierend auf Policennummer
-            vertragsdauer = hash(polizennummer) % 1000 + 30
+            # Simuliere Vertragsdauer basierend auf Policennummer (je Nummer gecacht)
+            vertragsdauer = _simulierte_vertragsdauer(polizennummer)
         else:
             vertragsdauer = 180  # Default: 6 Monate
 
@@ -514,29 +567,25 @@ class FuzzyRiskEngine:
         vorherige_schaeden = 0  # Default für neue Analyse
 
         # Schadenszeitpunkt
-        schadenszeit = getattr(meldung, 'schadenszeit', '') or ''
-        try:
-            if ':' in schadenszeit:
-                stunde = int(schadenszeit.split(':')[0])
-            elif 'nacht' in schadenszeit.lower():
-                stunde = 2
-            elif 'morgen' in schadenszeit.lower():
-                stunde = 7
-            elif 'mittag' in schadenszeit.lower():
-                stunde = 12
-            elif 'abend' in schadenszeit.lower():
-                stunde = 20
+        schadenszeit = schadenszeit or ''
+        stunde = 12
+        if isinstance(schadenszeit, str):
+            kopf, doppelpunkt, _ = schadenszeit.partition(':')
+            if doppelpunkt:
+                try:
+                    stunde = int(kopf)
+                except ValueError:
+                    pass
             else:
-                stunde = 12
-        except:
-            stunde = 12
+                zeit = schadenszeit.lower()
+                stunde = next((h for wort, h in _TAGESZEITEN if wort in zeit), 12)
 
         # Vollständigkeit berechnen
         meldung_dict = meldung.to_dict() if hasattr(meldung, 'to_dict') else {}
         vollstaendigkeit = self.berechne_vollstaendigkeit(meldung_dict)
 
         # Schadenstyp
-        schadenstyp = getattr(meldung, 'schadenstyp', '') or ''
+        schadenstyp = schadenstyp or ''
 
         return self.analyse(
             schadenshoehe=schadenshoehe,
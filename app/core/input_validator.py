@@ -40,6 +40,10 @@ class SwissInputValidator:
         r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     )
 
+    # Bereinigung von Eingaben (einmal kompiliert)
+    PHONE_CLEAN_PATTERN = re.compile(r'[^\d+]')
+    NON_DIGIT_PATTERN = re.compile(r'\D')
+
     # Verdächtige E-Mail Domains (Wegwerf-Mails)
     SUSPICIOUS_DOMAINS = [
         'tempmail', 'throwaway', 'guerrilla', 'mailinator',
@@ -68,7 +72,7 @@ class SwissInputValidator:
 
         # Normalisieren: Nur Ziffern und + behalten
         original = phone
-        cleaned = re.sub(r'[^\d+]', '', phone)
+        cleaned = self.PHONE_CLEAN_PATTERN.sub('', phone)
 
         # Leere Nummer nach Bereinigung
         if not cleaned or cleaned == '+':
@@ -237,7 +241,7 @@ class SwissInputValidator:
         if not plz or not plz.strip():
             return ValidationResult(valid=True, message="OK")  # Optional
 
-        cleaned = re.sub(r'\D', '', plz)
+        cleaned = self.NON_DIGIT_PATTERN.sub('', plz)
 
         if len(cleaned) != 4:
             return ValidationResult(
@@ -265,22 +269,22 @@ class SwissInputValidator:
 swiss_validator = SwissInputValidator()
 
 
-def generate_validation_response(field_name: str, value: str) -> Tuple[bool, str, Optional[str]]:
+def generate_validation_response(validator: str, value: str) -> Tuple[bool, str, Optional[str]]:
     """
     Generiert eine benutzerfreundliche Validierungsantwort
 
     Args:
-        field_name: Name des Feldes (kontakt_telefon, kontakt_email, etc.)
+        validator: Art der Prüfung ('phone', 'email' oder 'plz')
         value: Eingegebener Wert
 
     Returns:
         Tuple[is_valid, message, corrected_value]
     """
-    if field_name == 'kontakt_telefon':
+    if validator == 'phone':
         result = swiss_validator.validate_swiss_phone(value)
-    elif field_name == 'kontakt_email':
+    elif validator == 'email':
         result = swiss_validator.validate_email(value)
-    elif field_name == 'schadensort_plz':
+    elif validator == 'plz':
         result = swiss_validator.validate_plz(value)
     else:
         return True, "", None
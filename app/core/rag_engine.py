@@ -560,7 +560,7 @@ class RAGEngine:
         kb_id = document.metadata.get("knowledge_base", "default")
         texts = [chunk.content for chunk in document.chunks]
         chunk_ids = [chunk.id for chunk in document.chunks]
-        metadatas = [chunk.metadata for chunk in document.chunks]
+        metadatas = [chunk.full_metadata for chunk in document.chunks]
 
         # Dual-Embeddings erstellen
         dual_result = embedding_service.embed_dual(texts)
@@ -15,7 +15,7 @@ from typing import Optional, List, Dict, Any
 from pathlib import Path
 
 
-class UserRole(Enum):
+class UserRole(str, Enum):
     """Benutzerrollen für Gemeindeverwaltung"""
     ADMIN = "admin"                        # Vollzugriff, System-Konfiguration
     ABTEILUNGSLEITER = "abteilungsleiter"  # Wissensbasen verwalten, Berichte
@@ -12,7 +12,9 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.config import config
+from app.config import config, init_app_config
+
+init_app_config()
 
 
 # Seiten-Konfiguration (MUSS zuerst kommen)
@@ -33,6 +35,7 @@ from app.components.admin_panel import render_clustering_tab
 
 # Auth entfernt - direkter Zugang
 from app.components.icons import inject_icon_css
+from app.components.token_display import inject_token_css
 
 
 def apply_baloise_css():
@@ -271,6 +274,7 @@ def main():
 
     apply_baloise_css()
     inject_icon_css()
+    inject_token_css()
 
     # Direkt starten ohne Login
     render_sidebar()
@@ -15,7 +15,7 @@ from app.config import (
     UPLOADS_DIR, 
     KNOWLEDGE_BASES_DIR, 
     ALL_EXTENSIONS,
-    SUPPORTED_FORMATS
+    EXTENSION_TO_CATEGORY
 )
 
 
@@ -32,11 +32,7 @@ def is_supported_file(filename: str) -> bool:
 
 def get_file_category(filename: str) -> Optional[str]:
     """Gibt die Kategorie einer Datei zurück"""
-    ext = get_file_extension(filename)
-    for category, info in SUPPORTED_FORMATS.items():
-        if ext in info["extensions"]:
-            return category
-    return None
+    return EXTENSION_TO_CATEGORY.get(get_file_extension(filename))
 
 
 def get_mime_type(filename: str) -> str: